@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -143,6 +144,10 @@ AUTH_USER_MODEL = "accounts.Account"
 NPM_BIN_PATH = "npm.cmd"
 TAILWIND_APP_NAME = "theme"
 
+# Shared secret attendance kiosks send in the X-Kiosk-Token header; the kiosk
+# API is disabled while it is empty
+KIOSK_API_TOKEN = os.environ.get("KIOSK_API_TOKEN", "")
+
 INTERNAL_IPS = [
     "127.0.0.1",
     "localhost",
@@ -0,0 +1,608 @@
+"""Spreadsheet and CSV exports.
+
+Each export is declared as an :class:`Export` of :class:`Column` specs. Rows are
+read with ``values_list()`` over only the exported fields and fed from
+``QuerySet.iterator()``, timestamps are converted with one cached time zone,
+and numbers and dates are written as native cells with number formats.
+
+Workbooks are built by the export worker (``manage.py run_export_worker``) as
+ExportJobs saved under MEDIA_ROOT. They are written with openpyxl's write-only
+mode, which streams each row to a temporary file instead of keeping a cell
+object per value, so memory stays flat however many rows an export has. CSV
+exports (``?format=csv``, or ``?format=csv.gz`` for gzip) are for tools that
+only need flat data and are streamed in chunks as rows are produced.
+
+A job is keyed by the export, its normalized
+filters and a version of the exported data (row count and last update), so
+asking again for unchanged data serves the existing file at once. Exports with
+columns of the employees' accounts are rebuilt every time, since accounts have
+no update timestamp to version them by.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import tempfile
+import zlib
+from datetime import timedelta
+
+import openpyxl
+from django.core.files import File
+from django.db.models import Count, Max
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+from openpyxl.utils import get_column_letter
+
+from accounts.models import Employee
+from core.filters import (
+    filter_salary_calculations,
+    search_adjustments,
+    search_attendance,
+    search_employees,
+    search_salary_structures,
+)
+from core.models import (
+    Attendance,
+    Bonuses,
+    Deductions,
+    ExportJob,
+    SalaryCalculations,
+    SalaryStructure,
+)
+from core.payroll import month_range
+from core.scans import LOCAL_TZ
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CHUNK_SIZE = 2000
+CSV_FORMATS = ("csv", "csv.gz")
+NUMERIC_FILTERS = ("year", "month", "employee")
+# How long a replaced ExportJob stays available to the client it was given to
+SUPERSEDED_JOB_GRACE = timedelta(hours=1)
+
+HEADER_FONT = Font(bold=True)
+CENTER = Alignment(horizontal="center")
+
+# Number formats
+KIP = "#,##0.00"  # Amounts are stored to 1/100 kip
+DECIMAL = "0.00"
+DATE = "yyyy-mm-dd"
+DATETIME = "yyyy-mm-dd hh:mm"
+TIME = "hh:mm:ss"
+MONTH = "mmmm yyyy"
+
+
+def local(value):
+    """Converts an aware datetime to naive local time (Excel has no time zones)."""
+    return value.astimezone(LOCAL_TZ).replace(tzinfo=None) if value else None
+
+
+def choice_label(choices):
+    return dict(choices).get
+
+
+class Column:
+    """An exported column: its header, the ``values()`` field it reads, an optional
+    ``convert`` applied to each value and how it is shown in a workbook."""
+
+    def __init__(self, title, field, width=15, number_format=None, convert=None):
+        self.title = title
+        self.field = field
+        self.width = width
+        self.number_format = number_format
+        self.convert = convert
+
+
+def _version(queryset):
+    stats = queryset.aggregate(rows=Count("pk"), last=Max("updated_at"))
+    return [stats["rows"], stats["last"] and stats["last"].isoformat()]
+
+
+def _employees_version():
+    last = Employee.objects.aggregate(last=Max("updated_at"))["last"]
+    return last and last.isoformat()
+
+
+class Export:
+    """A declared export.
+
+    ``queryset`` is called with the export's ``filters`` (request parameter
+    names) to build the rows to export.
+    """
+
+    def __init__(self, name, filename, title, columns, queryset=None, filters=("search",)):
+        self.name = name
+        self.filename = filename
+        self.title = title
+        self.columns = columns
+        self.queryset = queryset
+        self.filters = filters
+
+    def index(self, field):
+        """Position of the column reading ``field`` in the rows of :meth:`rows`."""
+        return [column.field for column in self.columns].index(field)
+
+    def clean_filters(self, params):
+        """The export's non-empty filters from request ``params``, with the numeric
+        ones normalized (``03`` and ``3`` are the same month)."""
+        filters = {}
+        for name in self.filters:
+            value = params.get(name, "").strip()
+            if name in NUMERIC_FILTERS and value.isdigit():
+                value = str(int(value))
+            if value:
+                filters[name] = value
+        return filters
+
+    def data_version(self, filters):
+        """Row count and last update of the exported rows (and of employees, when
+        their columns are exported); it changes whenever the export may have.
+
+        Empty when the export has account columns, which cannot be versioned.
+        """
+        if any(column.field.startswith("user__") for column in self.columns):
+            return ""
+        version = _version(self.queryset(**filters))
+        if any(column.field.startswith("employee__") for column in self.columns):
+            version.append(_employees_version())
+        return json.dumps(version)
+
+    def rows(self, queryset, key=None):
+        """Yields the converted values of every row of ``queryset``, or
+        ``(key value, values)`` pairs when a ``key`` field is given."""
+        fields = [column.field for column in self.columns]
+        if key:
+            fields.insert(0, key)
+        converters = [(i + bool(key), c.convert) for i, c in enumerate(self.columns) if c.convert]
+        for row in queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE):
+            if converters:
+                row = list(row)
+                for index, convert in converters:
+                    row[index] = convert(row[index])
+            yield (row[0], row[1:]) if key else row
+
+    def write_sheet(self, worksheet, rows):
+        """Writes a header and a numbered line per row of ``rows`` to an empty
+        write-only ``worksheet``; returns the number of rows written."""
+        # Column widths must be set before the first row is written
+        widths = [5] + [column.width for column in self.columns]
+        for index, width in enumerate(widths, 1):
+            worksheet.column_dimensions[get_column_letter(index)].width = width
+
+        header = []
+        for title in ["No."] + [column.title for column in self.columns]:
+            cell = WriteOnlyCell(worksheet, value=title)
+            cell.font = HEADER_FONT
+            cell.alignment = CENTER
+            header.append(cell)
+        worksheet.append(header)
+
+        # One styled cell per formatted column, reused for every row: append()
+        # writes a row out before returning
+        styled = []
+        for index, column in enumerate(self.columns, 1):
+            if column.number_format:
+                cell = WriteOnlyCell(worksheet)
+                cell.number_format = column.number_format
+                styled.append((index, cell))
+        number = 0
+        for number, values in enumerate(rows, 1):
+            row = [number, *values]
+            for index, cell in styled:
+                cell.value = row[index]
+                row[index] = cell
+            worksheet.append(row)
+        return number
+
+    def write_workbook(self, workbook, filters):
+        """Writes the export as one sheet of a write-only ``workbook``; returns the row count."""
+        worksheet = workbook.create_sheet(self.title)
+        return self.write_sheet(worksheet, self.rows(self.queryset(**filters)))
+
+    def stream_csv(self, filters, compress=False):
+        return csv_response(
+            f"{self.filename}.csv",
+            [column.title for column in self.columns],
+            self.rows(self.queryset(**filters)),
+            compress=compress,
+        )
+
+
+def _csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def csv_response(filename, columns, rows, compress=False):
+    """Streams ``rows`` as a CSV attachment, gzip-compressed if ``compress``."""
+    chunks = _csv_chunks(columns, rows)
+    if compress:
+        response = StreamingHttpResponse(_gzip(chunks), content_type="application/gzip")
+        filename += ".gz"
+    else:
+        response = StreamingHttpResponse(chunks, content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _employees(search=""):
+    return search_employees(Employee.objects.order_by("name"), search)
+
+
+def _salary_structures(search=""):
+    return search_salary_structures(
+        SalaryStructure.objects.order_by("-updated_at", "employee__name"), search
+    )
+
+
+def _attendance(search=""):
+    return search_attendance(Attendance.objects.order_by("-date", "employee__name"), search)
+
+
+def _salary_calculations(year="", month="", employee="", status=""):
+    queryset, _ = filter_salary_calculations(
+        SalaryCalculations.objects.order_by("-month_year", "employee__name"),
+        year,
+        month,
+        employee,
+        status,
+    )
+    return queryset
+
+
+EMPLOYEES = Export(
+    "employees",
+    "employees_report",
+    "Employees",
+    [
+        Column("Name", "name", width=20),
+        Column("Email", "user__email", width=20),
+        Column("Position", "position", width=20),
+        Column("Department", "department", width=20),
+        Column("Contact Number", "contact_number", width=20),
+        Column("Bank Account Number", "bank_account_num", width=20),
+        Column("Employment Date", "employment_date", width=20, number_format=DATE),
+        Column(
+            "Status",
+            "user__is_active",
+            convert=lambda is_active: "Online" if is_active else "Offline",
+        ),
+    ],
+    _employees,
+)
+
+SALARY_STRUCTURES = Export(
+    "salary_structures",
+    "salary_structures_report",
+    "Salary Structures Report",
+    [
+        Column("Employee Name", "employee__name", width=25),
+        Column("Basic Salary (LAK)", "basic_salary", width=20, number_format=KIP),
+        Column("Overtime Rate (LAK)", "overtime_rate", width=20, number_format=KIP),
+        Column("Bonus Percentage (%)", "bonus_percentage", width=20, number_format=DECIMAL),
+        Column("Created At", "created_at", width=20, number_format=DATETIME, convert=local),
+        Column("Updated At", "updated_at", width=20, number_format=DATETIME, convert=local),
+    ],
+    _salary_structures,
+)
+
+
+def _adjustments(name, model, title):
+    def queryset(search=""):
+        return search_adjustments(model.objects.order_by("-date", "employee__name"), search)
+
+    return Export(
+        name,
+        f"{name}_report",
+        title,
+        [
+            Column("Employee Name", "employee__name", width=25),
+            Column("Date", "date", width=12, number_format=DATE),
+            Column("Reason", "reason", width=30),
+            Column("Amount (LAK)", "amount", width=15, number_format=KIP),
+            Column("Created At", "created_at", width=20, number_format=DATETIME, convert=local),
+            Column("Updated At", "updated_at", width=20, number_format=DATETIME, convert=local),
+        ],
+        queryset,
+    )
+
+
+DEDUCTIONS = _adjustments("deductions", Deductions, "Deductions Report")
+BONUSES = _adjustments("bonuses", Bonuses, "Bonuses Report")
+
+ATTENDANCE = Export(
+    "attendance",
+    "attendance_report",
+    "Attendance Report",
+    [
+        Column("Employee Name", "employee__name", width=25),
+        Column("Date", "date", width=12, number_format=DATE),
+        Column("Shift", "shift"),
+        Column("Scan In Time", "scan_in_time", number_format=TIME, convert=local),
+        Column("Scan Out Time", "scan_out_time", number_format=TIME, convert=local),
+        Column("Hours Worked", "hours_worked", number_format=DECIMAL),
+        Column("Overtime Hours", "overtime_hours", number_format=DECIMAL),
+        Column(
+            "Status",
+            "is_present",
+            width=10,
+            convert=lambda is_present: "Present" if is_present else "Absent",
+        ),
+    ],
+    _attendance,
+)
+
+SALARY_CALCULATIONS = Export(
+    "salary_calculations",
+    "salary_calculations_report",
+    "Salary Calculations",
+    [
+        Column("Employee", "employee__name", width=25),
+        Column("Month-Year", "month_year", width=18, number_format=MONTH),
+        Column("Basic Salary", "basic_salary_snapshot", width=18, number_format=KIP),
+        Column("Overtime Rate", "overtime_rate_snapshot", width=18, number_format=KIP),
+        Column("Total Hours Worked", "total_hours_worked", width=18, number_format=DECIMAL),
+        Column("Total Overtime Hours", "total_overtime_hours", width=18, number_format=DECIMAL),
+        Column("Total Deductions", "total_deductions_amount", width=18, number_format=KIP),
+        Column("Total Bonuses", "total_bonuses_amount", width=18, number_format=KIP),
+        Column("Gross Salary", "gross_salary", width=18, number_format=KIP),
+        Column("Net Salary", "net_salary", width=18, number_format=KIP),
+        Column(
+            "Status",
+            "status",
+            width=18,
+            convert=choice_label(SalaryCalculations.STATUS_CHOICES),
+        ),
+        Column(
+            "Payment Method",
+            "payment_method",
+            width=18,
+            convert=choice_label(SalaryCalculations.PAYMENT_METHOD_CHOICES),
+        ),
+        Column("Paid At", "paid_at", width=18, number_format=DATETIME, convert=local),
+        Column("Generated At", "generated_at", width=18, number_format=DATETIME, convert=local),
+        Column("Notes", "notes", width=18),
+    ],
+    _salary_calculations,
+    filters=("year", "month", "employee", "status"),
+)
+
+PAYROLL_SUMMARY = Export(
+    "payroll_summary",
+    "payroll_summary",
+    "Summary",
+    [
+        Column("Employee", "employee__name", width=25),
+        Column("Department", "employee__department", width=20),
+        Column("Days Present", "days_present", width=12),
+        Column("Hours Worked", "hours_worked", number_format=DECIMAL),
+        Column("Overtime Hours", "overtime_hours", number_format=DECIMAL),
+        Column("Deductions", "deductions", number_format=KIP),
+        Column("Bonuses", "bonuses", number_format=KIP),
+        Column("Gross Salary", "gross_salary", width=18, number_format=KIP),
+        Column("Net Salary", "net_salary", width=18, number_format=KIP),
+        Column("Status", "status"),
+    ],
+)
+
+
+class PayrollPack:
+    """The month-end payroll workbook: a per-employee summary followed by the
+    month's salary calculations, attendance, deductions and bonuses.
+
+    Each table is read once with a range query on its month index; the summary
+    is tallied from the rows as they are written to their sheets.
+    """
+
+    name = "payroll_pack"
+    filename = "payroll_pack"
+    title = "Monthly Payroll Pack"
+
+    def clean_filters(self, params):
+        """The ``year`` and ``month`` of the pack; raises ValueError if either is invalid."""
+        year, month = int(params.get("year", "")), int(params.get("month", ""))
+        month_range(year, month)
+        return {"year": str(year), "month": str(month)}
+
+    def querysets(self, filters):
+        start, end = month_range(int(filters["year"]), int(filters["month"]))
+        return [
+            (
+                SALARY_CALCULATIONS,
+                SalaryCalculations.objects.filter(month_year__gte=start, month_year__lt=end),
+                self._add_calculation,
+            ),
+            (
+                ATTENDANCE,
+                Attendance.objects.filter(date__gte=start, date__lt=end),
+                self._add_attendance,
+            ),
+            (
+                DEDUCTIONS,
+                Deductions.objects.filter(date__gte=start, date__lt=end),
+                self._add_amount("deductions"),
+            ),
+            (
+                BONUSES,
+                Bonuses.objects.filter(date__gte=start, date__lt=end),
+                self._add_amount("bonuses"),
+            ),
+        ]
+
+    def data_version(self, filters):
+        version = [_version(queryset) for _, queryset, _ in self.querysets(filters)]
+        return json.dumps(version + [_employees_version()])
+
+    @staticmethod
+    def _add_calculation(entry, row):
+        entry["gross_salary"] = row[SALARY_CALCULATIONS.index("gross_salary")]
+        entry["net_salary"] = row[SALARY_CALCULATIONS.index("net_salary")]
+        entry["status"] = row[SALARY_CALCULATIONS.index("status")]
+
+    @staticmethod
+    def _add_attendance(entry, row):
+        entry["days_present"] += row[ATTENDANCE.index("is_present")] == "Present"
+        entry["hours_worked"] += row[ATTENDANCE.index("hours_worked")]
+        entry["overtime_hours"] += row[ATTENDANCE.index("overtime_hours")]
+
+    @staticmethod
+    def _add_amount(total):
+        def add(entry, row):
+            entry[total] += row[DEDUCTIONS.index("amount")]  # Same columns as BONUSES
+
+        return add
+
+    @staticmethod
+    def _tally(rows, summary, add):
+        """Passes ``(employee id, values)`` rows through as values, adding each to
+        the employee's summary entry with ``add``."""
+        for employee_id, row in rows:
+            entry = summary.get(employee_id)
+            if entry is None:
+                entry = summary[employee_id] = {
+                    "employee__name": row[0],  # Every pack sheet starts with the employee name
+                    "days_present": 0,
+                    "hours_worked": 0,
+                    "overtime_hours": 0,
+                    "deductions": 0,
+                    "bonuses": 0,
+                }
+            add(entry, row)
+            yield row
+
+    def write_workbook(self, workbook, filters):
+        """Writes the pack to a write-only ``workbook``; returns the number of data rows."""
+        # Created first so it is the first sheet, filled once the other sheets are written
+        summary_sheet = workbook.create_sheet(PAYROLL_SUMMARY.title)
+        summary = {}
+        count = 0
+        for export, queryset, add in self.querysets(filters):
+            rows = export.rows(queryset.order_by("employee__name", "pk"), key="employee_id")
+            count += export.write_sheet(
+                workbook.create_sheet(export.title), self._tally(rows, summary, add)
+            )
+
+        departments = dict(Employee.objects.values_list("id", "department"))
+        for employee_id, entry in summary.items():
+            entry["employee__department"] = departments.get(employee_id, "")
+        fields = [column.field for column in PAYROLL_SUMMARY.columns]
+        PAYROLL_SUMMARY.write_sheet(
+            summary_sheet,
+            (
+                [entry.get(field) for field in fields]
+                for entry in sorted(summary.values(), key=lambda entry: entry["employee__name"])
+            ),
+        )
+        return count
+
+
+PAYROLL_PACK = PayrollPack()
+
+EXPORTS = {
+    export.name: export
+    for export in (
+        EMPLOYEES,
+        SALARY_STRUCTURES,
+        DEDUCTIONS,
+        BONUSES,
+        ATTENDANCE,
+        SALARY_CALCULATIONS,
+        PAYROLL_PACK,
+    )
+}
+
+
+def request_export(export, filters, user=None):
+    """Returns the ExportJob for ``export`` with ``filters`` (see
+    :meth:`Export.clean_filters`), queueing a new one unless a finished or pending
+    job exists for the current version of the data.
+
+    Unversioned exports only share a job that has not started yet.
+    """
+    cache_key = hashlib.sha256(
+        json.dumps([export.name, filters], sort_keys=True).encode()
+    ).hexdigest()
+    data_version = export.data_version(filters)
+    reusable = ("QUEUED", "RUNNING", "DONE") if data_version else ("QUEUED",)
+    job = (
+        ExportJob.objects.filter(
+            cache_key=cache_key, data_version=data_version, status__in=reusable
+        )
+        .order_by("-created_at")
+        .first()
+    )
+    if job is None or (job.status == "DONE" and not job.file.storage.exists(job.file.name)):
+        job = ExportJob.objects.create(
+            export=export.name,
+            filters=filters,
+            cache_key=cache_key,
+            data_version=data_version,
+            requested_by=user,
+        )
+    return job
+
+
+def run_export_job(job):
+    """Writes the workbook of a claimed ExportJob to MEDIA_ROOT.
+
+    Earlier jobs for the same export and filters are deleted once they are
+    superseded (another data version, or any earlier run of an unversioned
+    export) and were requested more than SUPERSEDED_JOB_GRACE ago, so pages
+    still polling or downloading a recent job keep working.
+    """
+    export = EXPORTS[job.export]
+    try:
+        workbook = openpyxl.Workbook(write_only=True)
+        job.row_count = export.write_workbook(workbook, job.filters)
+        with tempfile.TemporaryFile() as output:
+            workbook.save(output)
+            output.seek(0)
+            job.file.save(f"{export.filename}_{job.pk}.xlsx", File(output), save=False)
+    except Exception as e:
+        job.status = "FAILED"
+        job.error = str(e)
+    else:
+        job.status = "DONE"
+        superseded = ExportJob.objects.filter(
+            cache_key=job.cache_key,
+            status__in=("DONE", "FAILED"),
+            created_at__lt=timezone.now() - SUPERSEDED_JOB_GRACE,
+        ).exclude(pk=job.pk)
+        if job.data_version:
+            superseded = superseded.exclude(data_version=job.data_version)
+        for old in superseded:
+            old.file.delete(save=False)
+            old.delete()
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def export_file_response(job):
+    """Serves the file of a finished ExportJob."""
+    export = EXPORTS[job.export]
+    return FileResponse(
+        job.file.open("rb"),
+        as_attachment=True,
+        filename=f"{export.filename}.xlsx",
+        content_type=XLSX_CONTENT_TYPE,
+    )
@@ -0,0 +1,66 @@
+"""Search and filter parsing shared by the management pages and their exports."""
+
+from django.db.models import Q
+
+from core.payroll import month_range
+
+
+def search_employees(queryset, query):
+    if not query:
+        return queryset
+    return queryset.filter(
+        Q(name__icontains=query)
+        | Q(contact_number__icontains=query)
+        | Q(user__email__icontains=query)
+    )
+
+
+def search_salary_structures(queryset, query):
+    if not query:
+        return queryset
+    return queryset.filter(
+        Q(employee__name__icontains=query)
+        | Q(basic_salary__icontains=query)
+        | Q(bonus_percentage__icontains=query)
+    )
+
+
+def search_adjustments(queryset, query):
+    """Searches Deductions or Bonuses."""
+    if not query:
+        return queryset
+    return queryset.filter(
+        Q(employee__name__icontains=query)
+        | Q(reason__icontains=query)
+        | Q(date__icontains=query)  # Allows searching like '2024-07' or '2024-07-26'
+        | Q(amount__icontains=query)
+    )
+
+
+def search_attendance(queryset, query):
+    if not query:
+        return queryset
+    return queryset.filter(
+        Q(employee__name__icontains=query)
+        | Q(date__icontains=query)
+        | Q(shift__icontains=query)
+    )
+
+
+def filter_salary_calculations(queryset, year="", month="", employee="", status=""):
+    """Applies the salary calculations page filters.
+
+    Returns ``(queryset, month_valid)``; an invalid year or month is not applied.
+    """
+    month_valid = True
+    if year and month:
+        try:
+            start, end = month_range(int(year), int(month))
+            queryset = queryset.filter(month_year__gte=start, month_year__lt=end)
+        except ValueError:
+            month_valid = False
+    if employee:
+        queryset = queryset.filter(employee_id=employee)
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset, month_valid
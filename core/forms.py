@@ -7,6 +7,7 @@ from core.models import (
     Deductions,
     SalaryCalculations,
     SalaryStructure,
+    ShiftSchedule,
 )
 
 
@@ -27,13 +28,30 @@ class EmployeeForm(forms.ModelForm):
 class SalaryStructureForm(forms.ModelForm):
     class Meta:
         model = SalaryStructure
-        fields = ["employee", "basic_salary", "overtime_rate", "bonus_percentage"]
+        fields = [
+            "employee",
+            "basic_salary",
+            "overtime_rate",
+            "bonus_percentage",
+            "effective_from",
+            "effective_to",
+        ]
         widgets = {
             "basic_salary": forms.NumberInput(attrs={"step": "0.01"}),
             "overtime_rate": forms.NumberInput(attrs={"step": "0.01"}),
             "bonus_percentage": forms.NumberInput(attrs={"step": "0.01"}),
+            "effective_from": forms.DateInput(attrs={"type": "date"}),
+            "effective_to": forms.DateInput(attrs={"type": "date"}),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        effective_from = cleaned_data.get("effective_from")
+        effective_to = cleaned_data.get("effective_to")
+        if effective_from and effective_to and effective_to < effective_from:
+            raise forms.ValidationError("Effective to must not be before effective from.")
+        return cleaned_data
+
 
 class AttendanceForm(forms.ModelForm):
     class Meta:
@@ -46,6 +64,26 @@ class AttendanceForm(forms.ModelForm):
         }
 
 
+class ShiftScheduleForm(forms.ModelForm):
+    class Meta:
+        model = ShiftSchedule
+        fields = ["department", "weekday", "shift", "start_time", "end_time"]
+        widgets = {
+            "department": forms.TextInput(attrs={"list": "departments"}),
+            "start_time": forms.TimeInput(attrs={"type": "time"}),
+            "end_time": forms.TimeInput(attrs={"type": "time"}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["weekday"].choices = [("", "ທຸກມື້")] + ShiftSchedule.WEEKDAY_CHOICES
+        for field in self.fields.values():
+            field.widget.attrs["class"] = (
+                "bg-gray-50 border border-gray-300 text-gray-900 text-sm rounded-lg block w-full "
+                "p-2.5 dark:bg-gray-700 dark:border-gray-600 dark:text-white"
+            )
+
+
 class DeductionsForm(forms.ModelForm):
     class Meta:
         model = Deductions
@@ -151,3 +189,31 @@ class SalaryCalculationsForm(forms.ModelForm):
             # raise forms.ValidationError("Paid At date is required when status is PAID.")
             pass  # Or default to timezone.now() if you prefer auto-filling
         return paid_at
+
+
+class PayrollSimulationForm(forms.Form):
+    department = forms.ChoiceField(required=False, label="ພະແນກ")
+    raise_percentage = forms.DecimalField(
+        required=False, initial=0, max_digits=6, decimal_places=2, label="ເພີ່ມເງິນເດືອນ (%)"
+    )
+    overtime_rate_change = forms.DecimalField(
+        required=False, initial=0, max_digits=6, decimal_places=2, label="ປ່ຽນອັດຕາ OT (%)"
+    )
+    bonus_percentage_change = forms.DecimalField(
+        required=False, initial=0, max_digits=6, decimal_places=2, label="ປ່ຽນເປີເຊັນໂບນັດ (ຈຸດ)"
+    )
+    months = forms.IntegerField(
+        required=False, initial=12, min_value=1, max_value=60, label="ຈຳນວນເດືອນ"
+    )
+    basis_months = forms.IntegerField(
+        required=False, initial=3, min_value=1, max_value=24, label="ອີງຕາມຂໍ້ມູນຍ້ອນຫຼັງ (ເດືອນ)"
+    )
+
+    def __init__(self, *args, departments=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["department"].choices = [("", "ທຸກພະແນກ")] + [(d, d) for d in departments]
+        for field in self.fields.values():
+            field.widget.attrs["class"] = (
+                "bg-gray-50 border border-gray-300 text-gray-900 text-sm rounded-lg block w-full "
+                "p-2.5 dark:bg-gray-700 dark:border-gray-600 dark:text-white"
+            )
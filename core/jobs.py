@@ -0,0 +1,78 @@
+"""Background job queue shared by PayrollJob and ExportJob.
+
+Jobs are rows with a ``status`` (QUEUED, RUNNING, DONE, FAILED) that a worker
+command claims one at a time. Any number of workers can poll the same table.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+def claim_next_job(model):
+    """Marks the oldest queued job of ``model`` as running and returns it, or None.
+
+    The status check is part of the UPDATE, so two workers never claim the same job.
+    """
+    queued = model.objects.filter(status="QUEUED").order_by("created_at")
+    for job_id in queued.values_list("id", flat=True)[:10]:
+        claimed = model.objects.filter(id=job_id, status="QUEUED").update(
+            status="RUNNING", started_at=timezone.now(), updated_at=timezone.now()
+        )
+        if claimed:
+            return model.objects.get(id=job_id)
+    return None
+
+
+class JobWorkerCommand(BaseCommand):
+    """A worker that claims and runs the queued jobs of ``model`` until stopped.
+
+    Subclasses set ``model``, ``name`` and ``default_interval`` and implement
+    :meth:`run_job` and :meth:`done_message`.
+    """
+
+    model = None
+    name = "job"
+    default_interval = 5
+
+    def run_job(self, job):
+        raise NotImplementedError
+
+    def done_message(self, job):
+        raise NotImplementedError
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs currently queued, then exit instead of polling",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=self.default_interval,
+            help="Seconds to wait between polls when the queue is empty "
+            f"(default: {self.default_interval})",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{self.name.capitalize()} worker started.")
+
+        while True:
+            job = claim_next_job(self.model)
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+                continue
+
+            self.stdout.write(f"Running {job}...")
+            job = self.run_job(job)
+            if job.status == "DONE":
+                message = f"Job #{job.pk} done: {self.done_message(job)}"
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stdout.write(self.style.ERROR(f"Job #{job.pk} failed: {job.error}"))
+
+        self.stdout.write(self.style.SUCCESS(f"No more queued {self.name} jobs."))
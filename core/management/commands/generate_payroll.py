@@ -0,0 +1,126 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def _init_worker():
+    # Needed when the pool spawns fresh interpreters; a no-op after fork
+    import django
+
+    django.setup()
+    connections.close_all()
+
+
+def _run_shard(first_month, last_month, id_range, dirty_only=False):
+    """Computes one shard of employees and writes its rows in a single transaction."""
+    from core.payroll import generate_payroll_range
+
+    result = generate_payroll_range(
+        first_month, last_month, id_range=id_range, dirty_only=dirty_only, single_transaction=True
+    )
+    return {
+        "id_range": id_range,
+        "created": result.created,
+        "updated": result.updated,
+        "unchanged": result.unchanged,
+        "skipped": result.skipped,
+        "reset_paid": result.reset_paid,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates salary calculations for a month (or a range of months), "
+        "sharding employees across processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, required=True)
+        parser.add_argument("--month", type=int, required=True)
+        parser.add_argument("--to-year", type=int, help="Last year of a multi-month backfill")
+        parser.add_argument("--to-month", type=int, help="Last month of a multi-month backfill")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes (default: number of CPUs)",
+        )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            help="Number of employee shards (default: same as --workers)",
+        )
+        parser.add_argument(
+            "--dirty-only",
+            action="store_true",
+            help="Only recompute employees whose attendance, deductions or bonuses changed",
+        )
+
+    def handle(self, *args, **options):
+        from core.payroll import active_employee_shards, month_range
+
+        dirty_only = options["dirty_only"]
+        to_year = options["to_year"] or options["year"]
+        to_month = options["to_month"] or options["month"]
+        try:
+            first_month, _ = month_range(options["year"], options["month"])
+            last_month, _ = month_range(to_year, to_month)
+        except ValueError:
+            raise CommandError("Invalid year or month.")
+        if last_month < first_month:
+            raise CommandError("The last month must not be before the first month.")
+        workers = max(options["workers"], 1)
+        shards = active_employee_shards(options["shards"] or workers)
+
+        period = first_month.strftime("%m/%Y")
+        if last_month != first_month:
+            period += last_month.strftime(" - %m/%Y")
+        self.stdout.write(
+            f"Generating payroll for {period}: {len(shards)} shard(s) on {workers} worker(s)..."
+        )
+
+        results = []
+        if workers == 1:
+            for id_range in shards:
+                results.append(_run_shard(first_month, last_month, id_range, dirty_only))
+        else:
+            # Children must open their own database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(_run_shard, first_month, last_month, id_range, dirty_only)
+                    for id_range in shards
+                ]
+                for future in as_completed(futures):
+                    results.append(future.result())
+
+        created = updated = unchanged = 0
+        for shard in results:
+            created += shard["created"]
+            updated += shard["updated"]
+            unchanged += shard["unchanged"]
+            for name in shard["skipped"]:
+                self.stdout.write(
+                    self.style.WARNING(f"No salary structure found for {name}. Skipped.")
+                )
+            for name, month in shard["reset_paid"]:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Re-generated PENDING salary for {name} for {month.strftime('%B %Y')}. "
+                        "Previous status was PAID."
+                    )
+                )
+            self.stdout.write(
+                f"Shard {shard['id_range'][0]}-{shard['id_range'][1]}: "
+                f"{shard['created']} new, {shard['updated']} changed, "
+                f"{shard['unchanged']} unchanged"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully generated/updated {created + updated} salary records "
+                f"({created} new, {updated} changed, {unchanged} unchanged)."
+            )
+        )
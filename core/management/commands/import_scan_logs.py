@@ -0,0 +1,37 @@
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.scan_logs import ScanLogImportError, import_scan_logs
+
+
+class Command(BaseCommand):
+    help = "Imports badge-reader punch logs (CSV or XLSX) into attendance records"
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+", help="Log files to import")
+
+    def handle(self, *args, **options):
+        with ExitStack() as stack:
+            try:
+                files = [
+                    (stack.enter_context(open(path, "rb")), Path(path).name)
+                    for path in options["files"]
+                ]
+                result = import_scan_logs(files)
+            except (OSError, ScanLogImportError) as e:
+                raise CommandError(str(e))
+
+        if result.invalid_rows:
+            self.stdout.write(self.style.WARNING(f"Skipped {result.invalid_rows} invalid rows."))
+        for employee_id in sorted(result.unknown_employees):
+            self.stdout.write(
+                self.style.WARNING(f"No employee with id {employee_id}. Punches skipped.")
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.punches} punches: {result.created} attendance records created, "
+                f"{result.updated} updated."
+            )
+        )
@@ -0,0 +1,30 @@
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.summaries import rebuild_month_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-employee monthly attendance, deduction and bonus summaries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Only rebuild this year")
+        parser.add_argument("--month", type=int, help="Only rebuild this month (needs --year)")
+
+    def handle(self, *args, **options):
+        year = options["year"]
+        month = options["month"]
+        start = end = None
+
+        if month and not year:
+            raise CommandError("--month requires --year.")
+        if year and month:
+            start = timezone.datetime(year, month, 1).date()
+            end = start + relativedelta(months=1)
+        elif year:
+            start = timezone.datetime(year, 1, 1).date()
+            end = start + relativedelta(years=1)
+
+        written = rebuild_month_summaries(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Successfully rebuilt {written} monthly summaries."))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.scans import roll_up_scan_events
+
+
+class Command(BaseCommand):
+    help = "Folds kiosk scan events into attendance records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Roll up the events currently recorded, then exit instead of polling",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between polls when there are no new events (default: 5)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of events folded per transaction (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Scan rollup worker started.")
+
+        total = 0
+        while True:
+            processed = roll_up_scan_events(batch_size=options["batch_size"])
+            total += processed
+            if processed:
+                self.stdout.write(f"Rolled up {processed} scan events.")
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {total} scan events in total."))
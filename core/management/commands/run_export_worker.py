@@ -0,0 +1,16 @@
+from core.exports import run_export_job
+from core.jobs import JobWorkerCommand
+from core.models import ExportJob
+
+
+class Command(JobWorkerCommand):
+    help = "Processes queued workbook export jobs"
+    model = ExportJob
+    name = "export"
+    default_interval = 2
+
+    def run_job(self, job):
+        return run_export_job(job)
+
+    def done_message(self, job):
+        return f"{job.row_count} rows in {job.file.name}"
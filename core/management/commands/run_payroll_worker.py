@@ -0,0 +1,18 @@
+from core.jobs import JobWorkerCommand
+from core.models import PayrollJob
+from core.payroll import run_payroll_job
+
+
+class Command(JobWorkerCommand):
+    help = "Processes queued payroll generation jobs"
+    model = PayrollJob
+    name = "payroll"
+
+    def run_job(self, job):
+        return run_payroll_job(job)
+
+    def done_message(self, job):
+        return (
+            f"{job.created_count} new, {job.updated_count} changed, "
+            f"{job.unchanged_count} unchanged, {job.skipped_count} skipped"
+        )
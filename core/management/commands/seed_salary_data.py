@@ -15,6 +15,8 @@ from core.models import (
     SalaryCalculations,
     SalaryStructure,
 )
+from core.money import from_minor, salary_totals, to_minor
+from core.payroll import StructureIndex
 
 
 class Command(BaseCommand):
@@ -91,21 +93,21 @@ class Command(BaseCommand):
                 self.stdout.write(f"Created Employee: {employee.name}")
             employees.append(employee)
 
-            structure, created_struct = SalaryStructure.objects.get_or_create(
-                employee=employee,
-                defaults={
-                    "basic_salary": Decimal(emp_data["basic_salary"]),
-                    "overtime_rate": Decimal(emp_data["overtime_rate"]),
-                    "bonus_percentage": Decimal(random.uniform(0, 0.1)),  # 0 to 10% bonus potential
-                },
-            )
-            if created_struct:
+            # Employees may already have a history of structures
+            if not SalaryStructure.objects.filter(employee=employee).exists():
+                SalaryStructure.objects.create(
+                    employee=employee,
+                    basic_salary=Decimal(emp_data["basic_salary"]),
+                    overtime_rate=Decimal(emp_data["overtime_rate"]),
+                    bonus_percentage=Decimal(random.uniform(0, 0.1)),  # 0 to 10% bonus potential
+                )
                 self.stdout.write(f"Created Salary Structure for {employee.name}")
 
         self.stdout.write(
             "Generating attendance, deductions, bonuses, and salary calculations for the past 3 months..."
         )
 
+        structures = StructureIndex()
         today = timezone.now().date()
         for i in range(3, -1, -1):  # Last 3 months + current month (for generation testing)
             # Target month: first day of the month
@@ -137,7 +139,15 @@ class Command(BaseCommand):
                 self.stdout.write(
                     f"Processing data for {emp.name} for {target_month_date.strftime('%B %Y')}"
                 )
-                salary_structure = SalaryStructure.objects.get(employee=emp)
+                salary_structure = structures.resolve(emp.id, target_month_date)
+                if salary_structure is None:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"No salary structure in force for {emp.name} for "
+                            f"{target_month_date.strftime('%B %Y')}. Skipped."
+                        )
+                    )
+                    continue
 
                 # --- Generate Attendance ---
                 total_hours_worked_month = Decimal(0)
@@ -239,12 +249,13 @@ class Command(BaseCommand):
                     )
                     continue
 
-                gross_salary = (
-                    salary_structure.basic_salary
-                    + (total_overtime_hours_month * salary_structure.overtime_rate)
-                    + total_bonuses_month
+                gross_salary, net_salary = salary_totals(
+                    to_minor(salary_structure.basic_salary),
+                    to_minor(total_overtime_hours_month),
+                    to_minor(salary_structure.overtime_rate),
+                    to_minor(total_bonuses_month),
+                    to_minor(total_deductions_month),
                 )
-                net_salary = gross_salary - total_deductions_month
 
                 status = "PENDING"
                 payment_method = None
@@ -274,8 +285,8 @@ class Command(BaseCommand):
                         "total_overtime_hours": total_overtime_hours_month,
                         "total_deductions_amount": total_deductions_month,
                         "total_bonuses_amount": total_bonuses_month,
-                        "gross_salary": gross_salary,
-                        "net_salary": net_salary,
+                        "gross_salary": from_minor(gross_salary),
+                        "net_salary": from_minor(net_salary),
                         "status": status,
                         "payment_method": payment_method,
                         "paid_at": paid_at,
@@ -1,33 +1,82 @@
-from django.core.management.base import BaseCommand
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils import timezone
 
 from core.models import Attendance, Employee
+from core.signals import touch_employee_months
+
+BATCH_SIZE = 500
 
 
 class Command(BaseCommand):
     help = "Updates attendance records for employees who did not scan in"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date", type=date.fromisoformat, help="Day to mark, as YYYY-MM-DD (default: today)"
+        )
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            type=date.fromisoformat,
+            help="First day of a backfill range, as YYYY-MM-DD",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            type=date.fromisoformat,
+            help="Last day of a backfill range, as YYYY-MM-DD (default: today)",
+        )
+
     def handle(self, *args, **options):
-        today = timezone.now().date()
-        employees = Employee.objects.all()
-
-        for employee in employees:
-            attendance, created = Attendance.objects.get_or_create(
-                employee=employee,
-                date=today,
-                defaults={
-                    "shift": "Absent",
-                    "hours_worked": 0,
-                    "overtime_hours": 0,
-                    "is_present": False,
-                },
+        today = timezone.localdate()
+        if options["date"] and (options["date_from"] or options["date_to"]):
+            raise CommandError("Use either --date or --from/--to, not both.")
+        first = options["date"] or options["date_from"] or options["date_to"] or today
+        last = options["date"] or options["date_to"] or (today if options["date_from"] else first)
+        if last < first:
+            raise CommandError("--to must not be before --from.")
+
+        days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        employee_ids = list(
+            Employee.objects.filter(status__iexact="active").values_list("id", flat=True)
+        )
+        in_range = Attendance.objects.filter(
+            employee__status__iexact="active", date__gte=first, date__lte=last
+        )
+        existing = set(in_range.values_list("employee_id", "date"))
+        missing = [
+            Attendance(
+                employee_id=employee_id,
+                date=day,
+                shift="Absent",
+                hours_worked=0,
+                overtime_hours=0,
+                is_present=False,
             )
+            for employee_id in employee_ids
+            for day in days
+            if (employee_id, day) not in existing
+        ]
+        # Rows entered by hand with hours worked are left alone
+        unscanned = in_range.filter(scan_in_time__isnull=True, hours_worked=0, is_present=True)
 
-            if created or not attendance.scan_in_time:
-                attendance.is_present = False
-                attendance.save()
-                self.stdout.write(
-                    self.style.SUCCESS(f"Marked {employee.name} as absent for {today}")
-                )
+        with transaction.atomic():
+            unscanned_keys = list(unscanned.values_list("employee_id", "date"))
+            unscanned.update(is_present=False, updated_at=timezone.now())
+            # A row created concurrently (e.g. by a scan-in) wins over the absent row
+            Attendance.objects.bulk_create(missing, batch_size=BATCH_SIZE, ignore_conflicts=True)
+            # Bulk writes bypass the model signals
+            touch_employee_months(
+                unscanned_keys + [(row.employee_id, row.date) for row in missing]
+            )
 
-        self.stdout.write(self.style.SUCCESS("Successfully updated attendance records"))
+        period = str(first) if first == last else f"{first} - {last}"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully updated attendance records for {period}: "
+                f"{len(missing)} absent records created, {len(unscanned_keys)} marked absent."
+            )
+        )
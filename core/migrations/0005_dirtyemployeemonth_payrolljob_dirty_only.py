@@ -0,0 +1,33 @@
+# Generated by Django 4.2.15 on 2026-10-18 11:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0004_payrolljob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrolljob',
+            name='dirty_only',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='DirtyEmployeeMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month_year', models.DateField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dirty_months', to='accounts.employee')),
+            ],
+            options={
+                'unique_together': {('employee', 'month_year')},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.15 on 2026-10-18 11:13
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def build_summaries(apps, schema_editor):
+    Attendance = apps.get_model("core", "Attendance")
+    Deductions = apps.get_model("core", "Deductions")
+    Bonuses = apps.get_model("core", "Bonuses")
+    EmployeeMonthSummary = apps.get_model("core", "EmployeeMonthSummary")
+
+    def by_month(model, **aggregates):
+        return (
+            model.objects.annotate(month=TruncMonth("date"))
+            .order_by()
+            .values("employee_id", "month")
+            .annotate(**aggregates)
+        )
+
+    totals = defaultdict(dict)
+    for row in by_month(
+        Attendance,
+        hours=Sum("hours_worked"),
+        overtime=Sum("overtime_hours"),
+        present=Count("id", filter=Q(is_present=True)),
+        absent=Count("id", filter=Q(is_present=False)),
+    ):
+        totals[(row["employee_id"], row["month"])].update(
+            hours_worked=row["hours"] or 0,
+            overtime_hours=row["overtime"] or 0,
+            present_days=row["present"],
+            absent_days=row["absent"],
+        )
+    for row in by_month(Deductions, amount=Sum("amount")):
+        totals[(row["employee_id"], row["month"])]["deductions_total"] = row["amount"] or 0
+    for row in by_month(Bonuses, amount=Sum("amount")):
+        totals[(row["employee_id"], row["month"])]["bonuses_total"] = row["amount"] or 0
+
+    EmployeeMonthSummary.objects.bulk_create(
+        [
+            EmployeeMonthSummary(employee_id=emp_id, month_year=month, **values)
+            for (emp_id, month), values in totals.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0005_dirtyemployeemonth_payrolljob_dirty_only'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeMonthSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month_year', models.DateField()),
+                ('hours_worked', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('deductions_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('bonuses_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('absent_days', models.PositiveIntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='month_summaries', to='accounts.employee')),
+            ],
+            options={
+                'unique_together': {('employee', 'month_year')},
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.15 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_employeemonthsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrolljob',
+            name='end_month',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payrolljob',
+            name='end_year',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
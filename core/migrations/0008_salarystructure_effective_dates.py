@@ -0,0 +1,27 @@
+# Generated by Django 4.2.15 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_payrolljob_end_month'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salarystructure',
+            name='effective_from',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='salarystructure',
+            name='effective_to',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='salarystructure',
+            index=models.Index(fields=['employee', 'effective_from'], name='core_salary_employe_8a137a_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.15 on 2026-10-18 11:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0009_payrolljob_unchanged_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanRollupCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('direction', models.CharField(choices=[('IN', 'Scan in'), ('OUT', 'Scan out')], max_length=3)),
+                ('scanned_at', models.DateTimeField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_events', to='accounts.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'scanned_at'], name='core_scanev_employe_a681be_idx')],
+            },
+        ),
+    ]
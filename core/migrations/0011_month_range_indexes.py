@@ -0,0 +1,94 @@
+# Generated by Django 4.2.15 on 2026-10-18 11:26
+
+from dateutil.relativedelta import relativedelta
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def merge_duplicate_attendance(apps, schema_editor):
+    """Folds duplicate (employee, date) attendance rows into the oldest one so the
+    unique constraint can be added, then refreshes the affected month summaries."""
+    Attendance = apps.get_model("core", "Attendance")
+    EmployeeMonthSummary = apps.get_model("core", "EmployeeMonthSummary")
+    DirtyEmployeeMonth = apps.get_model("core", "DirtyEmployeeMonth")
+
+    duplicates = (
+        Attendance.objects.order_by()
+        .values("employee_id", "date")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    months = set()
+    for duplicate in duplicates:
+        keep, *extra = Attendance.objects.filter(
+            employee_id=duplicate["employee_id"], date=duplicate["date"]
+        ).order_by("id")
+        for row in extra:
+            if row.scan_in_time and (not keep.scan_in_time or row.scan_in_time < keep.scan_in_time):
+                keep.scan_in_time = row.scan_in_time
+            if row.scan_out_time and (
+                not keep.scan_out_time or row.scan_out_time > keep.scan_out_time
+            ):
+                keep.scan_out_time = row.scan_out_time
+            keep.hours_worked = max(keep.hours_worked, row.hours_worked)
+            keep.overtime_hours = max(keep.overtime_hours, row.overtime_hours)
+            keep.is_present = keep.is_present or row.is_present
+        keep.save()
+        Attendance.objects.filter(id__in=[row.id for row in extra]).delete()
+        months.add((keep.employee_id, keep.date.replace(day=1)))
+
+    for employee_id, month in months:
+        totals = Attendance.objects.filter(
+            employee_id=employee_id, date__gte=month, date__lt=month + relativedelta(months=1)
+        ).aggregate(
+            hours=Sum("hours_worked"),
+            overtime=Sum("overtime_hours"),
+            present=Count("id", filter=Q(is_present=True)),
+            absent=Count("id", filter=Q(is_present=False)),
+        )
+        EmployeeMonthSummary.objects.filter(employee_id=employee_id, month_year=month).update(
+            hours_worked=totals["hours"] or 0,
+            overtime_hours=totals["overtime"] or 0,
+            present_days=totals["present"],
+            absent_days=totals["absent"],
+        )
+        DirtyEmployeeMonth.objects.get_or_create(employee_id=employee_id, month_year=month)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_scanevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='core_attend_date_801bf5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bonuses',
+            index=models.Index(fields=['employee', 'date'], name='core_bonuse_employe_c64e78_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bonuses',
+            index=models.Index(fields=['date'], name='core_bonuse_date_4ce24c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deductions',
+            index=models.Index(fields=['employee', 'date'], name='core_deduct_employe_215af8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deductions',
+            index=models.Index(fields=['date'], name='core_deduct_date_dc568e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salarycalculations',
+            index=models.Index(fields=['month_year', 'status'], name='core_salary_month_y_958548_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_attendance_per_employee_day'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.15 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_shiftschedule'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('scan_in_time__isnull', False), ('scan_out_time__isnull', True)), fields=['employee', 'scan_in_time'], name='open_attendance_idx'),
+        ),
+    ]
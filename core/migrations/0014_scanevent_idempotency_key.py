@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_attendance_open_shift_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanevent',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 import pytz
+from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils import timezone
@@ -20,6 +21,12 @@ class SalaryStructure(BaseModel):
     bonus_percentage = models.DecimalField(
         max_digits=5, decimal_places=2, validators=[MinValueValidator(0)]
     )
+    # Period in which this structure applies (inclusive); empty means open-ended
+    effective_from = models.DateField(null=True, blank=True)
+    effective_to = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["employee", "effective_from"])]
 
     def __str__(self):
         return f"Salary Structure for {self.employee.name}"
@@ -46,6 +53,23 @@ class Attendance(BaseModel):
     scan_in_time = models.DateTimeField(null=True, blank=True)
     scan_out_time = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["employee", "date"], name="unique_attendance_per_employee_day"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["date"]),
+            # Open rows (scanned in, not yet out) are few, so scan-out finds an
+            # employee's open shift in one small probe even across midnight
+            models.Index(
+                fields=["employee", "scan_in_time"],
+                condition=models.Q(scan_in_time__isnull=False, scan_out_time__isnull=True),
+                name="open_attendance_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Attendance for {self.employee.name} on {self.date}"
 
@@ -76,6 +100,12 @@ class Deductions(BaseModel):
     reason = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["employee", "date"]),
+            models.Index(fields=["date"]),
+        ]
+
     def __str__(self):
         return f"Deduction for {self.employee.name} on {self.date}"
 
@@ -86,6 +116,12 @@ class Bonuses(BaseModel):
     reason = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["employee", "date"]),
+            models.Index(fields=["date"]),
+        ]
+
     def __str__(self):
         return f"Bonus for {self.employee.name} on {self.date}"
 
@@ -150,6 +186,7 @@ class SalaryCalculations(BaseModel):
     class Meta:
         unique_together = ("employee", "month_year")  # Ensure one record per employee per month
         ordering = ["-month_year", "employee__name"]
+        indexes = [models.Index(fields=["month_year", "status"])]
 
     def __str__(self):
         return (
@@ -169,3 +206,227 @@ class SalaryCalculations(BaseModel):
     def total_overtime_pay(self):
         """Calculates the total pay from overtime hours."""
         return self.total_overtime_hours * self.overtime_rate_snapshot
+
+
+class EmployeeMonthSummary(BaseModel):
+    """Monthly totals of an employee's attendance, deductions and bonuses.
+    Kept current by core.signals; rebuild with `manage.py rebuild_month_summaries`."""
+
+    employee = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, related_name="month_summaries"
+    )
+    month_year = models.DateField()  # First day of the month
+    hours_worked = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    overtime_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    deductions_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    bonuses_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    present_days = models.PositiveIntegerField(default=0)
+    absent_days = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("employee", "month_year")
+
+    def __str__(self):
+        return f"Summary for {self.employee_id} for {self.month_year.strftime('%B %Y')}"
+
+
+class DirtyEmployeeMonth(BaseModel):
+    """An employee-month whose attendance, deductions or bonuses changed since the
+    last payroll run. Maintained by core.signals and cleared by the payroll engine."""
+
+    employee = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, related_name="dirty_months"
+    )
+    month_year = models.DateField()  # First day of the month
+
+    class Meta:
+        unique_together = ("employee", "month_year")
+
+    def __str__(self):
+        return f"{self.employee_id} dirty for {self.month_year.strftime('%B %Y')}"
+
+
+class PayrollJob(BaseModel):
+    STATUS_CHOICES = [
+        ("QUEUED", "Queued"),
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed"),
+    ]
+
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    # Optional: last month of a multi-month backfill (inclusive)
+    end_year = models.PositiveIntegerField(null=True, blank=True)
+    end_month = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Optional: restrict the run to a single employee
+    employee = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, related_name="payroll_jobs", null=True, blank=True
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="payroll_jobs",
+        null=True,
+        blank=True,
+    )
+    # Only recompute employees with changes since the last run
+    dirty_only = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="QUEUED")
+
+    # Progress, updated by the worker after each written batch
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+
+    # Result counts
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    unchanged_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True, default="")
+    error = models.TextField(blank=True, default="")
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"Payroll job #{self.pk} for {self.period_display} ({self.status})"
+
+    @property
+    def period_display(self):
+        period = f"{self.month:02d}/{self.year}"
+        if self.end_year and self.end_month:
+            period += f" - {self.end_month:02d}/{self.end_year}"
+        return period
+
+    @property
+    def is_finished(self):
+        return self.status in ("DONE", "FAILED")
+
+
+class ExportJob(BaseModel):
+    """A workbook export run by the export worker (manage.py run_export_worker).
+
+    Finished files are kept in MEDIA_ROOT and served again for the same export
+    and filters as long as the exported data has not changed.
+    """
+
+    STATUS_CHOICES = [
+        ("QUEUED", "Queued"),
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed"),
+    ]
+
+    export = models.CharField(max_length=50)  # Name of an export in core.exports.EXPORTS
+    filters = models.JSONField(default=dict, blank=True)
+    # Hash of the export and its normalized filters
+    cache_key = models.CharField(max_length=64)
+    # Row count and last update of the exported data when the job was requested
+    data_version = models.CharField(max_length=100)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="export_jobs",
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="QUEUED")
+    file = models.FileField(upload_to="exports/", blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["cache_key", "data_version"]),
+        ]
+
+    def __str__(self):
+        return f"Export job #{self.pk} for {self.export} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ("DONE", "FAILED")
+
+
+class ScanEvent(BaseModel):
+    """A raw scan as received from a kiosk. Rows are only ever inserted; the
+    rollup worker (core.scans.roll_up_scan_events) folds them into Attendance."""
+
+    DIRECTION_CHOICES = [
+        ("IN", "Scan in"),
+        ("OUT", "Scan out"),
+    ]
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="scan_events")
+    direction = models.CharField(max_length=3, choices=DIRECTION_CHOICES)
+    scanned_at = models.DateTimeField()
+    # Generated by the kiosk so replayed offline scans are recorded only once
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["employee", "scanned_at"])]
+
+    def __str__(self):
+        return f"{self.get_direction_display()} by {self.employee_id} at {self.scanned_at}"
+
+
+class ScanRollupCursor(BaseModel):
+    """Id of the last ScanEvent folded into Attendance (a single row)."""
+
+    last_event_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Scan events rolled up to #{self.last_event_id}"
+
+
+class ShiftSchedule(BaseModel):
+    """Working hours of a shift. Rows for a department and weekday take precedence
+    over rows for all departments or all days; see core.shifts for how scans are
+    matched to shifts.
+
+    Each process caches the compiled calendar for core.shifts.CACHE_SECONDS. A
+    change is seen at once by the process that saved it, and by other processes
+    (other web workers, the scan rollup) within that time.
+    """
+
+    SHIFT_CHOICES = [
+        ("Morning", "Morning"),
+        ("Afternoon", "Afternoon"),
+        ("Night", "Night"),
+    ]
+    WEEKDAY_CHOICES = [
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    ]
+
+    # Empty department / weekday: applies to all departments / every day
+    department = models.CharField(max_length=100, blank=True)
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES, null=True, blank=True)
+    shift = models.CharField(max_length=10, choices=SHIFT_CHOICES)
+    start_time = models.TimeField()
+    # Work after this time counts as overtime; at or before start_time, the shift
+    # ends the next day
+    end_time = models.TimeField()
+
+    class Meta:
+        ordering = ["department", "weekday", "start_time"]
+
+    def __str__(self):
+        scope = self.department or "All departments"
+        day = self.get_weekday_display() if self.weekday is not None else "every day"
+        return f"{self.shift} {self.start_time:%H:%M}-{self.end_time:%H:%M} ({scope}, {day})"
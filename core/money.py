@@ -0,0 +1,55 @@
+"""Fixed-point payroll arithmetic on integer minor units.
+
+Amounts are handled as integers of 1/100 kip and hours as integers of 1/100
+hour, matching the two decimal places of the model fields. Decimal is only
+used at the model boundary (:func:`to_minor` / :func:`from_minor`), so bulk
+computations are plain integer additions and multiplications.
+
+Rounding policy:
+
+* Values read from the database already have two decimal places and convert
+  exactly. Other inputs are rounded half up (away from zero) to 1/100.
+* Overtime pay (hours x rate) is the only product; it is rounded half up to
+  1/100 kip once per employee-month. Every other total is an exact sum.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+SCALE = 100  # Minor units per kip (and hundredths per hour)
+
+
+def to_minor(value):
+    """Converts a Decimal, int, float or str amount to integer minor units."""
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value * SCALE
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int(value.scaleb(2).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_minor(minor):
+    """Converts integer minor units back to a Decimal with two decimal places."""
+    return Decimal(minor).scaleb(-2)
+
+
+def _div_round(numerator, denominator):
+    """Integer division rounded half up (away from zero)."""
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if remainder * 2 >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def overtime_pay(overtime_hours, overtime_rate):
+    """Pay for ``overtime_hours`` (1/100 hour) at ``overtime_rate`` (minor units per hour)."""
+    return _div_round(overtime_hours * overtime_rate, SCALE)
+
+
+def salary_totals(basic_salary, overtime_hours, overtime_rate, bonuses, deductions):
+    """Returns ``(gross, net)`` in minor units; all arguments are minor units."""
+    # Basic salary is a fixed monthly amount
+    gross = basic_salary + overtime_pay(overtime_hours, overtime_rate) + bonuses
+    return gross, gross - deductions
+
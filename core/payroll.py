@@ -0,0 +1,343 @@
+"""Set-based payroll generation.
+
+A month is computed from one EmployeeMonthSummary row per employee (see
+core.summaries) and the results are written with bulk_create/bulk_update, so
+the number of queries does not depend on the number of employees. Totals are
+computed in integer minor units (see core.money).
+"""
+
+from bisect import bisect_left
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Employee
+from core.money import from_minor, salary_totals, to_minor
+from core.models import (
+    DirtyEmployeeMonth,
+    EmployeeMonthSummary,
+    PayrollJob,
+    SalaryCalculations,
+    SalaryStructure,
+)
+
+BATCH_SIZE = 500
+
+CALCULATED_FIELDS = [
+    "basic_salary_snapshot",
+    "overtime_rate_snapshot",
+    "total_hours_worked",
+    "total_overtime_hours",
+    "total_deductions_amount",
+    "total_bonuses_amount",
+    "gross_salary",
+    "net_salary",
+]
+
+UPDATED_FIELDS = CALCULATED_FIELDS + [
+    "status",
+    "paid_at",
+    "payment_method",
+    "generated_at",
+    "updated_at",
+]
+
+
+class PayrollResult:
+    """Outcome of a payroll run, used by the views and commands for reporting."""
+
+    def __init__(self, first_month, last_month=None):
+        self.month_year = first_month
+        self.last_month = last_month or first_month
+        self.created = 0  # New rows
+        self.updated = 0  # Existing rows whose figures changed
+        self.unchanged = 0  # Existing rows left untouched
+        self.skipped = []  # Names of employees without a structure in force for some month
+        self.reset_paid = []  # (name, month) of PAID records that went back to PENDING
+
+    @property
+    def generated(self):
+        return self.created + self.updated
+
+
+def month_range(year, month):
+    """Returns the half-open ``[start, end)`` date range of the given month."""
+    start = timezone.datetime(year, month, 1).date()
+    return start, start + relativedelta(months=1)
+
+
+def active_employee_shards(count):
+    """Splits the active employees into ``count`` contiguous id ranges of similar size."""
+    ids = list(
+        Employee.objects.filter(status__iexact="active").order_by("id").values_list("id", flat=True)
+    )
+    size = -(-len(ids) // max(count, 1))  # Ceiling division
+    return [(ids[i], ids[min(i + size, len(ids)) - 1]) for i in range(0, len(ids), size or 1)]
+
+
+class StructureIndex:
+    """Resolves the SalaryStructure in force for an employee and month.
+
+    All structures in ``scope`` are loaded with one query and kept per employee,
+    sorted by ``effective_from``. A structure applies to a month when its
+    inclusive ``[effective_from, effective_to]`` period overlaps it (empty bounds
+    are open-ended); when several apply, the one starting last wins, then the most
+    recently updated. Results are memoized, so repeated lookups are O(1).
+    """
+
+    def __init__(self, scope=None):
+        self._starts = {}
+        self._structures = {}
+        self._resolved = {}
+        rows = sorted(
+            SalaryStructure.objects.filter(**(scope or {})),
+            key=lambda s: (s.employee_id, s.effective_from or date.min, s.updated_at),
+        )
+        for structure in rows:
+            self._starts.setdefault(structure.employee_id, []).append(
+                structure.effective_from or date.min
+            )
+            self._structures.setdefault(structure.employee_id, []).append(structure)
+
+    def resolve(self, employee_id, month):
+        """Returns the structure in force during ``month`` (a first day), or None."""
+        key = (employee_id, month)
+        if key not in self._resolved:
+            self._resolved[key] = self._find(employee_id, month)
+        return self._resolved[key]
+
+    def _find(self, employee_id, month):
+        starts = self._starts.get(employee_id)
+        if not starts:
+            return None
+        # Candidates are the structures starting before the end of the month
+        i = bisect_left(starts, month + relativedelta(months=1))
+        structures = self._structures[employee_id]
+        while i > 0:
+            i -= 1
+            structure = structures[i]
+            if structure.effective_to is None or structure.effective_to >= month:
+                return structure
+        return None
+
+
+def _write(to_create, to_update, progress=None):
+    """Writes the computed rows in batches, reporting progress after each one."""
+    # Each batch commits on its own (unless nested in an outer transaction)
+    # so progress is visible to pollers
+    total = len(to_create) + len(to_update)
+    processed = 0
+    if progress:
+        progress(processed, total)
+    for i in range(0, len(to_create), BATCH_SIZE):
+        batch = to_create[i : i + BATCH_SIZE]
+        with transaction.atomic():
+            SalaryCalculations.objects.bulk_create(batch)
+        processed += len(batch)
+        if progress:
+            progress(processed, total)
+    for i in range(0, len(to_update), BATCH_SIZE):
+        batch = to_update[i : i + BATCH_SIZE]
+        with transaction.atomic():
+            SalaryCalculations.objects.bulk_update(batch, UPDATED_FIELDS)
+        processed += len(batch)
+        if progress:
+            progress(processed, total)
+
+
+def generate_payroll(year, month, **options):
+    """Creates or updates the SalaryCalculations of every active employee for a month.
+
+    Accepts the same options as :func:`generate_payroll_range`.
+    """
+    start, _ = month_range(year, month)
+    return generate_payroll_range(start, start, **options)
+
+
+def generate_payroll_range(
+    first_month,
+    last_month,
+    employee_id=None,
+    id_range=None,
+    dirty_only=False,
+    progress=None,
+    single_transaction=False,
+):
+    """Creates or updates SalaryCalculations for every month from ``first_month`` to
+    ``last_month`` (first days of the months, inclusive) in a single pass.
+
+    Pass ``employee_id`` to restrict the run to a single employee, or ``id_range``
+    (an inclusive ``(first_id, last_id)`` pair) to compute one shard of employees.
+    With ``dirty_only`` only employee-months marked in DirtyEmployeeMonth are recomputed.
+    ``progress`` is called as ``progress(processed, total)`` after each written batch.
+    With ``single_transaction`` all rows are written in one transaction; the reads
+    stay outside it so concurrent shards do not deadlock on SQLite.
+    """
+    result = PayrollResult(first_month, last_month)
+    run_started = timezone.now()
+    months = []
+    month = first_month
+    while month <= last_month:
+        months.append(month)
+        month += relativedelta(months=1)
+
+    employees = Employee.objects.filter(status__iexact="active")
+    scope = {}
+    if employee_id:
+        employees = employees.filter(id=employee_id)
+        scope["employee_id"] = employee_id
+    if id_range:
+        employees = employees.filter(id__range=id_range)
+        scope["employee_id__gte"], scope["employee_id__lte"] = id_range
+    in_range = {"month_year__gte": first_month, "month_year__lte": last_month, **scope}
+    dirty = None
+    if dirty_only:
+        dirty = set(
+            DirtyEmployeeMonth.objects.filter(**in_range).values_list("employee_id", "month_year")
+        )
+        dirty_ids = list({emp_id for emp_id, _ in dirty})
+        employees = employees.filter(id__in=dirty_ids)
+        scope["employee_id__in"] = dirty_ids
+        in_range["employee_id__in"] = dirty_ids
+
+    # One read per table for the whole range, keyed by (employee, month)
+    summaries = {
+        (summary.employee_id, summary.month_year): summary
+        for summary in EmployeeMonthSummary.objects.filter(**in_range)
+    }
+    structures = StructureIndex(scope)
+    existing = {
+        (calc.employee_id, calc.month_year): calc
+        for calc in SalaryCalculations.objects.filter(**in_range)
+    }
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for emp_id, emp_name in employees.values_list("id", "name"):
+        for month in months:
+            key = (emp_id, month)
+            if dirty is not None and key not in dirty:
+                continue
+
+            structure = structures.resolve(emp_id, month)
+            if structure is None:
+                if emp_name not in result.skipped:
+                    result.skipped.append(emp_name)
+                continue
+
+            summary = summaries.get(key)
+            if summary is None:
+                total_hours = total_overtime = total_deductions = total_bonuses = 0
+            else:
+                total_hours = to_minor(summary.hours_worked)
+                total_overtime = to_minor(summary.overtime_hours)
+                total_deductions = to_minor(summary.deductions_total)
+                total_bonuses = to_minor(summary.bonuses_total)
+
+            basic_salary = to_minor(structure.basic_salary)
+            overtime_rate = to_minor(structure.overtime_rate)
+            gross_salary, net_salary = salary_totals(
+                basic_salary, total_overtime, overtime_rate, total_bonuses, total_deductions
+            )
+
+            values = {
+                "basic_salary_snapshot": from_minor(basic_salary),
+                "overtime_rate_snapshot": from_minor(overtime_rate),
+                "total_hours_worked": from_minor(total_hours),
+                "total_overtime_hours": from_minor(total_overtime),
+                "total_deductions_amount": from_minor(total_deductions),
+                "total_bonuses_amount": from_minor(total_bonuses),
+                "gross_salary": from_minor(gross_salary),
+                "net_salary": from_minor(net_salary),
+            }
+
+            calculation = existing.get(key)
+            if calculation is None:
+                to_create.append(
+                    SalaryCalculations(
+                        employee_id=emp_id,
+                        month_year=month,
+                        status="PENDING",
+                        generated_at=now,
+                        **values,
+                    )
+                )
+                continue
+
+            # Rows whose figures did not change are not written at all, so they
+            # keep their status, payment details and generated_at
+            if all(getattr(calculation, field) == value for field, value in values.items()):
+                result.unchanged += 1
+                continue
+
+            if calculation.status == "PAID":
+                result.reset_paid.append((emp_name, month))
+            for field, value in values.items():
+                setattr(calculation, field, value)
+            # Reset to pending on re-generation
+            calculation.status = "PENDING"
+            calculation.paid_at = None
+            calculation.payment_method = None
+            calculation.generated_at = now
+            calculation.updated_at = now
+            to_update.append(calculation)
+
+    if single_transaction:
+        with transaction.atomic():
+            _write(to_create, to_update, progress)
+    else:
+        _write(to_create, to_update, progress)
+
+    # Changes recorded after the run started stay dirty for the next run
+    DirtyEmployeeMonth.objects.filter(updated_at__lte=run_started, **in_range).delete()
+
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    return result
+
+
+def run_payroll_job(job):
+    """Runs a claimed PayrollJob and records its progress and result counts."""
+
+    def report(processed, total):
+        PayrollJob.objects.filter(pk=job.pk).update(
+            processed=processed, total=total, updated_at=timezone.now()
+        )
+        job.processed = processed
+        job.total = total
+
+    first_month, _ = month_range(job.year, job.month)
+    last_month = first_month
+    if job.end_year and job.end_month:
+        last_month, _ = month_range(job.end_year, job.end_month)
+
+    try:
+        result = generate_payroll_range(
+            first_month,
+            last_month,
+            employee_id=job.employee_id,
+            dirty_only=job.dirty_only,
+            progress=report,
+        )
+    except Exception as e:
+        job.status = "FAILED"
+        job.error = str(e)
+    else:
+        job.status = "DONE"
+        job.created_count = result.created
+        job.updated_count = result.updated
+        job.unchanged_count = result.unchanged
+        job.skipped_count = len(result.skipped)
+        lines = [f"No salary structure found for {name}. Skipped." for name in result.skipped]
+        lines += [
+            f"Re-generated PENDING salary for {name} for {month.strftime('%B %Y')}. "
+            "Previous status was PAID."
+            for name, month in result.reset_paid
+        ]
+        job.message = "\n".join(lines)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
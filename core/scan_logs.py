@@ -0,0 +1,133 @@
+"""Bulk import of raw badge-reader punch logs (CSV or XLSX).
+
+Files are read row by row (openpyxl read-only mode for XLSX) and folded into
+the first and last punch of each employee and day, which become the scan-in
+and scan-out of that day's Attendance row. Rows are then written in bulk, so
+a month of logs costs a handful of queries.
+
+A log needs a header row with an ``employee_id`` (or ``employee``) column and
+either a ``timestamp`` (or ``datetime``) column or separate ``date`` and
+``time`` columns. Naive times are taken as Asia/Vientiane local time.
+"""
+
+import csv
+import io
+from datetime import date, datetime, time
+
+import openpyxl
+
+from accounts.models import Employee
+from core.scans import LOCAL_TZ, apply_punch_days, fold_punch
+
+EMPLOYEE_COLUMNS = ("employee_id", "employee")
+TIMESTAMP_COLUMNS = ("timestamp", "datetime")
+
+
+class ScanLogImportError(Exception):
+    """Raised when a log file cannot be read at all."""
+
+
+class ImportResult:
+    """Outcome of a scan log import, used by the view and the command for reporting."""
+
+    def __init__(self):
+        self.punches = 0
+        self.invalid_rows = 0
+        self.unknown_employees = set()
+        self.created = 0
+        self.updated = 0
+
+
+def _rows(source, filename):
+    if filename.lower().endswith(".xlsx"):
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        yield from csv.reader(io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+
+
+def _column(header, names):
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def _to_datetime(value, day=None):
+    if isinstance(value, str):
+        value = value.strip()
+        value = time.fromisoformat(value) if day else datetime.fromisoformat(value)
+    if isinstance(value, time):
+        value = datetime.combine(day, value)
+    if not isinstance(value, datetime):
+        raise ValueError(value)
+    return value.replace(tzinfo=LOCAL_TZ) if value.tzinfo is None else value
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+
+def read_punches(source, filename, result):
+    """Yields ``(employee_id, aware datetime)`` for every valid row of a log file.
+
+    ``source`` is a binary file object; ``filename`` decides the format.
+    Rows that cannot be parsed are counted in ``result.invalid_rows``.
+    """
+    rows = _rows(source, filename)
+    header = next(rows, None)
+    if header is None:
+        return
+    header = [str(cell or "").strip().lower() for cell in header]
+    employee_col = _column(header, EMPLOYEE_COLUMNS)
+    timestamp_col = _column(header, TIMESTAMP_COLUMNS)
+    date_col = _column(header, ("date",))
+    time_col = _column(header, ("time",))
+    if employee_col is None or (timestamp_col is None and (date_col is None or time_col is None)):
+        raise ScanLogImportError(
+            f"{filename}: expected an employee_id column and a timestamp column "
+            "(or date and time columns)."
+        )
+
+    for row in rows:
+        if not row or all(cell in (None, "") for cell in row):
+            continue
+        try:
+            employee_id = int(row[employee_col])
+            if timestamp_col is not None:
+                punched_at = _to_datetime(row[timestamp_col])
+            else:
+                punched_at = _to_datetime(row[time_col], _to_date(row[date_col]))
+        except (ValueError, TypeError, IndexError):
+            result.invalid_rows += 1
+            continue
+        result.punches += 1
+        yield employee_id, punched_at
+
+
+def import_scan_logs(files):
+    """Imports ``(source, filename)`` log files and upserts their Attendance rows
+    (see :func:`core.scans.apply_punch_days` for how they merge with existing rows).
+    """
+    result = ImportResult()
+    days = {}
+    for source, filename in files:
+        for employee_id, punched_at in read_punches(source, filename, result):
+            fold_punch(days, employee_id, punched_at)
+    if not days:
+        return result
+
+    employee_ids = {emp_id for emp_id, _ in days}
+    known = set(Employee.objects.filter(id__in=employee_ids).values_list("id", flat=True))
+    result.unknown_employees = employee_ids - known
+    result.created, result.updated = apply_punch_days(
+        {key: span for key, span in days.items() if key[0] in known}
+    )
+    return result
@@ -0,0 +1,443 @@
+"""Attendance scan-in/scan-out writes shared by the client pages, the kiosk API
+and the punch log import.
+
+Scans are recorded by async functions (``a`` prefix) built on the async ORM
+interface, so the scan views can be served under ASGI without a thread per
+request. A direct scan writes its Attendance row with a single conditional
+UPDATE (or INSERT for the first scan of the day), so concurrent scans of the
+same employee cannot both succeed even though the async ORM has no
+transactions. Kiosks instead append ScanEvent rows (one at a time, or in
+batches replayed after being offline), which :func:`roll_up_scan_events` later
+folds into Attendance in batches.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from accounts.models import Employee
+from core.models import Attendance, ScanEvent, ScanRollupCursor
+from core.shifts import shift_calendar
+from core.signals import touch_employee_months
+
+LOCAL_TZ = ZoneInfo("Asia/Vientiane")
+
+HOURS = Decimal("0.01")
+
+BATCH_SIZE = 500
+
+# An open shift older than this is a forgotten scan-out, not the one being closed
+OPEN_SHIFT_WINDOW = timedelta(hours=24)
+
+PUNCH_FIELDS = [
+    "shift",
+    "is_present",
+    "scan_in_time",
+    "scan_out_time",
+    "hours_worked",
+    "overtime_hours",
+    "updated_at",
+]
+
+# Scan outcomes
+SCANNED_IN = "scanned_in"
+ALREADY_SCANNED_IN = "already_scanned_in"
+SCANNED_OUT = "scanned_out"
+ALREADY_SCANNED_OUT = "already_scanned_out"
+NOT_SCANNED_IN = "not_scanned_in"
+UNKNOWN_EMPLOYEE = "unknown_employee"
+
+
+class ScanResult:
+    """Outcome of a scan, used by the views for messages and JSON responses."""
+
+    def __init__(self, status, scanned_at, shift=None, hours_worked=None, overtime=None):
+        self.status = status
+        self.scanned_at = scanned_at
+        self.shift = shift
+        self.hours_worked = hours_worked
+        self.overtime = overtime  # Overtime added by a scan-out after the shift end
+
+    @property
+    def ok(self):
+        return self.status in (SCANNED_IN, SCANNED_OUT)
+
+
+def _hours(delta):
+    return Decimal(delta.total_seconds() / 3600).quantize(HOURS, rounding=ROUND_HALF_UP)
+
+
+def fold_punch(days, employee_id, punched_at):
+    """Adds a raw punch to ``days``, which maps (employee_id, local date) to the
+    [first, last] punch of that day."""
+    punched_at = punched_at.astimezone(LOCAL_TZ)
+    key = (employee_id, punched_at.date())
+    span = days.get(key)
+    if span is None:
+        days[key] = [punched_at, punched_at]
+    elif punched_at < span[0]:
+        span[0] = punched_at
+    elif punched_at > span[1]:
+        span[1] = punched_at
+
+
+def fold_event(days, employee_id, direction, scanned_at):
+    """Adds a ScanEvent to ``days`` like :func:`fold_punch`, keeping the earliest
+    scan-in and the latest scan-out (either may stay None)."""
+    scanned_at = scanned_at.astimezone(LOCAL_TZ)
+    span = days.setdefault((employee_id, scanned_at.date()), [None, None])
+    if direction == "IN":
+        if span[0] is None or scanned_at < span[0]:
+            span[0] = scanned_at
+    elif span[1] is None or scanned_at > span[1]:
+        span[1] = scanned_at
+
+
+def _overtime(scan_out, shift_end):
+    return _hours(scan_out - shift_end) if scan_out > shift_end else Decimal("0.00")
+
+
+def paired_values(scan_in, scan_out, department="", calendar=None):
+    """Attendance field values for a day whose first punch is ``scan_in`` and last
+    punch is ``scan_out`` (None, or equal to ``scan_in``, when there was only one).
+
+    The shift and its end (for overtime) come from the shift calendar of the
+    employee's ``department``.
+    """
+    scan_in = scan_in.astimezone(LOCAL_TZ)
+    shift, shift_end = (calendar or shift_calendar()).lookup(department, scan_in)
+    values = {
+        "shift": shift,
+        "is_present": True,
+        "scan_in_time": scan_in,
+        "scan_out_time": None,
+        "hours_worked": Decimal("0.00"),
+        "overtime_hours": Decimal("0.00"),
+    }
+    if scan_out is not None and scan_out > scan_in:
+        scan_out = scan_out.astimezone(LOCAL_TZ)
+        values["scan_out_time"] = scan_out
+        values["hours_worked"] = _hours(scan_out - scan_in)
+        values["overtime_hours"] = _overtime(scan_out, shift_end)
+    return values
+
+
+async def arecord_scan_in(employee_id, department="", now=None):
+    """Records a scan-in for today, creating the Attendance row if needed.
+
+    Concurrent scans are settled by the database: the UPDATE only matches a row
+    without a scan-in, and the unique (employee, date) constraint rejects a
+    second INSERT, after which the UPDATE is retried against the winning row.
+    """
+    now = (now or timezone.now()).astimezone(LOCAL_TZ)
+    today = now.date()
+    calendar = await sync_to_async(shift_calendar)()
+    shift, _ = calendar.lookup(department, now)
+
+    todays = Attendance.objects.filter(employee_id=employee_id, date=today)
+    pending = todays.filter(scan_in_time__isnull=True)
+    values = {"scan_in_time": now, "shift": shift, "is_present": True}
+    if await pending.aupdate(updated_at=timezone.now(), **values):
+        await sync_to_async(touch_employee_months)([(employee_id, today)])
+    elif await todays.aexists():
+        return ScanResult(ALREADY_SCANNED_IN, now)
+    elif not await Employee.objects.filter(pk=employee_id).aexists():
+        return ScanResult(UNKNOWN_EMPLOYEE, now)
+    else:
+        try:
+            # The post_save signal refreshes the summaries
+            await Attendance.objects.acreate(
+                employee_id=employee_id, date=today, hours_worked=0, overtime_hours=0, **values
+            )
+        except IntegrityError:
+            # Another scan (or the absence job) created today's row first
+            if not await pending.aupdate(updated_at=timezone.now(), **values):
+                return ScanResult(ALREADY_SCANNED_IN, now)
+            await sync_to_async(touch_employee_months)([(employee_id, today)])
+    return ScanResult(SCANNED_IN, now, shift=shift)
+
+
+async def arecord_scan_out(employee_id, department="", now=None):
+    """Records a scan-out on the employee's open Attendance row, setting hours worked
+    and any overtime after the shift end.
+
+    The open row (scanned in, not yet out) is found through a partial index rather
+    than by today's date, so a night shift scanned in before midnight is closed
+    the next morning. Rows scanned in more than OPEN_SHIFT_WINDOW ago are treated
+    as forgotten scan-outs and left alone, and a repeated scan-out is recognized
+    over the same window.
+    """
+    now = (now or timezone.now()).astimezone(LOCAL_TZ)
+
+    recent = Attendance.objects.filter(
+        employee_id=employee_id,
+        scan_in_time__gt=now - OPEN_SHIFT_WINDOW,
+        scan_in_time__lte=now,
+    )
+    row = await (
+        recent.filter(scan_in_time__isnull=False, scan_out_time__isnull=True)
+        .order_by("-scan_in_time")
+        .values("id", "date", "scan_in_time", "shift")
+        .afirst()
+    )
+    if row is None:
+        # A shift closed within the window, possibly across midnight
+        if await recent.filter(scan_out_time__isnull=False).aexists():
+            return ScanResult(ALREADY_SCANNED_OUT, now)
+        return ScanResult(NOT_SCANNED_IN, now)
+
+    hours_worked = _hours(now - row["scan_in_time"])
+    calendar = await sync_to_async(shift_calendar)()
+    _, shift_end = calendar.lookup(department, row["scan_in_time"].astimezone(LOCAL_TZ))
+    overtime = _overtime(now, shift_end)
+    updated = await Attendance.objects.filter(pk=row["id"], scan_out_time__isnull=True).aupdate(
+        scan_out_time=now,
+        hours_worked=hours_worked,
+        overtime_hours=F("overtime_hours") + overtime,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        # Another scan-out won the race
+        return ScanResult(ALREADY_SCANNED_OUT, now)
+    await sync_to_async(touch_employee_months)([(employee_id, row["date"])])
+    return ScanResult(
+        SCANNED_OUT, now, shift=row["shift"], hours_worked=hours_worked, overtime=overtime
+    )
+
+
+def _existing_rows(days):
+    """Loads the Attendance rows of exactly the (employee_id, date) keys of ``days``.
+
+    Keys are queried in chunks, each as one ``date = ... AND employee_id IN (...)``
+    condition per date, so neither the rows loaded nor the query parameters grow
+    with other employees or days.
+    """
+    keys = sorted(days, key=lambda key: (key[1], key[0]))
+    existing = {}
+    for i in range(0, len(keys), BATCH_SIZE // 2):  # At most BATCH_SIZE parameters
+        employees_by_date = defaultdict(list)
+        for employee_id, day in keys[i : i + BATCH_SIZE // 2]:
+            employees_by_date[day].append(employee_id)
+        same_days = Q()
+        for day, employee_ids in employees_by_date.items():
+            same_days |= Q(date=day, employee_id__in=employee_ids)
+        for attendance in Attendance.objects.filter(same_days):
+            existing[(attendance.employee_id, attendance.date)] = attendance
+    return existing
+
+
+def _scan_in_of(span, attendance):
+    """The earliest of a day's folded scan-in and the scan-in already recorded."""
+    scan_ins = [span[0], attendance and attendance.scan_in_time]
+    return min((scan_in for scan_in in scan_ins if scan_in), default=None)
+
+
+def _attach_night_scan_outs(days, existing):
+    """Moves scan-outs that have no scan-in before them on their own day to the
+    employee's shift still open from the day before, like :func:`arecord_scan_out`.
+
+    The open rows are looked up through the open-shift partial index and added to
+    ``existing``; a shift scanned in more than OPEN_SHIFT_WINDOW before the
+    scan-out is not closed by it.
+    """
+    orphans = {}
+    for key, span in days.items():
+        if span[1] is not None:
+            scan_in = _scan_in_of(span, existing.get(key))
+            if scan_in is None or scan_in > span[1]:
+                orphans[key] = span[1]
+    if not orphans:
+        return
+
+    candidates = defaultdict(set)
+    for employee_id, day in days:
+        candidates[employee_id].add(day)
+    open_rows = Attendance.objects.filter(
+        employee_id__in={employee_id for employee_id, _ in orphans},
+        scan_in_time__isnull=False,
+        scan_out_time__isnull=True,
+        scan_in_time__gt=min(orphans.values()) - OPEN_SHIFT_WINDOW,
+        scan_in_time__lte=max(orphans.values()),
+    )
+    for attendance in open_rows:
+        existing.setdefault((attendance.employee_id, attendance.date), attendance)
+        candidates[attendance.employee_id].add(attendance.date)
+
+    for (employee_id, day), scan_out in sorted(orphans.items(), key=lambda item: item[1]):
+        latest = None
+        for open_day in candidates[employee_id]:
+            key = (employee_id, open_day)
+            span = days.get(key, [None, None])
+            attendance = existing.get(key)
+            if open_day >= day or span[1] or (attendance and attendance.scan_out_time):
+                continue
+            scan_in = _scan_in_of(span, attendance)
+            if scan_in and scan_out - OPEN_SHIFT_WINDOW < scan_in <= scan_out:
+                if latest is None or scan_in > latest[0]:
+                    latest = (scan_in, key)
+        if latest is None:
+            continue
+        days.setdefault(latest[1], [None, None])[1] = scan_out
+        span = days[(employee_id, day)]
+        if span[0] is None:
+            del days[(employee_id, day)]
+        else:
+            span[1] = None
+
+
+def apply_punch_days(days):
+    """Upserts the Attendance rows of ``days`` ({(employee_id, date): [scan_in,
+    scan_out]}, built by :func:`fold_punch` or :func:`fold_event`) in bulk.
+
+    Punches are merged with existing rows for the same day: the earliest scan-in
+    and latest scan-out win, and overtime never goes below what was recorded, so
+    applying the same punches twice changes nothing. A scan-out without a scan-in
+    before it on its day closes a shift left open the day before (see
+    :func:`_attach_night_scan_outs`); other days without any scan-in are left
+    alone. Returns ``(created, updated)``.
+    """
+    if not days:
+        return 0, 0
+    departments = dict(
+        Employee.objects.filter(id__in={emp_id for emp_id, _ in days}).values_list(
+            "id", "department"
+        )
+    )
+    calendar = shift_calendar()
+    existing = _existing_rows(days)
+    _attach_night_scan_outs(days, existing)
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for (employee_id, day), (first, last) in days.items():
+        attendance = existing.get((employee_id, day))
+        if attendance is None:
+            if first is not None:
+                values = paired_values(first, last, departments.get(employee_id, ""), calendar)
+                to_create.append(Attendance(employee_id=employee_id, date=day, **values))
+            continue
+
+        if attendance.scan_in_time and (first is None or attendance.scan_in_time < first):
+            first = attendance.scan_in_time
+        if attendance.scan_out_time and (last is None or attendance.scan_out_time > last):
+            last = attendance.scan_out_time
+        if first is None:
+            continue
+        values = paired_values(first, last, departments.get(employee_id, ""), calendar)
+        values["overtime_hours"] = max(values["overtime_hours"], attendance.overtime_hours)
+        for field, value in values.items():
+            setattr(attendance, field, value)
+        attendance.updated_at = now
+        to_update.append(attendance)
+
+    with transaction.atomic():
+        Attendance.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        Attendance.objects.bulk_update(to_update, PUNCH_FIELDS, batch_size=BATCH_SIZE)
+        # Bulk writes bypass the model signals
+        touch_employee_months((a.employee_id, a.date) for a in to_create + to_update)
+    return len(to_create), len(to_update)
+
+
+async def arecord_scan_event(employee_id, direction, now=None):
+    """Appends a ScanEvent; the hot path of the kiosk API is this single INSERT."""
+    return await ScanEvent.objects.acreate(
+        employee_id=employee_id, direction=direction, scanned_at=now or timezone.now()
+    )
+
+
+def record_scan_events(events):
+    """Appends buffered kiosk scans, given as ``(idempotency_key, employee_id,
+    direction, scanned_at)``, in one transaction.
+
+    Events whose key was already recorded (a replayed sync) or repeats within
+    ``events`` are skipped, as are events for unknown employees, and so are keys
+    a concurrent sync records first. Returns ``(recorded, duplicate_keys,
+    unknown_keys)``.
+    """
+    known = set(
+        Employee.objects.filter(id__in={event[1] for event in events}).values_list("id", flat=True)
+    )
+    with transaction.atomic():
+        seen = set(
+            ScanEvent.objects.filter(
+                idempotency_key__in={event[0] for event in events}
+            ).values_list("idempotency_key", flat=True)
+        )
+        duplicates = []
+        unknown = []
+        new_events = []
+        for key, employee_id, direction, scanned_at in events:
+            if key in seen:
+                duplicates.append(key)
+            elif employee_id not in known:
+                unknown.append(key)
+            else:
+                seen.add(key)
+                new_events.append((key, employee_id, direction, scanned_at))
+
+        while new_events:
+            try:
+                with transaction.atomic():
+                    ScanEvent.objects.bulk_create(
+                        [
+                            ScanEvent(
+                                idempotency_key=key,
+                                employee_id=employee_id,
+                                direction=direction,
+                                scanned_at=scanned_at,
+                            )
+                            for key, employee_id, direction, scanned_at in new_events
+                        ],
+                        batch_size=BATCH_SIZE,
+                    )
+                break
+            except IntegrityError:
+                # A concurrent replay of the same batch recorded some keys first
+                taken = set(
+                    ScanEvent.objects.filter(
+                        idempotency_key__in={event[0] for event in new_events}
+                    ).values_list("idempotency_key", flat=True)
+                )
+                if not taken:
+                    raise
+                duplicates.extend(event[0] for event in new_events if event[0] in taken)
+                new_events = [event for event in new_events if event[0] not in taken]
+    return len(new_events), duplicates, unknown
+
+
+def roll_up_scan_events(batch_size=1000):
+    """Folds the next batch of ScanEvents into Attendance and advances the cursor.
+
+    Returns the number of events processed (0 when there is nothing new).
+    Rollups may run concurrently: a batch is claimed by moving the cursor with a
+    conditional UPDATE in the transaction that applies it, so only one rollup
+    applies each batch and the cursor never moves backwards. A rollup that loses
+    the claim reads the cursor again and goes on with the next batch.
+    """
+    while True:
+        cursor, _ = ScanRollupCursor.objects.get_or_create(pk=1)
+        events = list(
+            ScanEvent.objects.filter(id__gt=cursor.last_event_id)
+            .order_by("id")
+            .values_list("id", "employee_id", "direction", "scanned_at")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        days = {}
+        for _, employee_id, direction, scanned_at in events:
+            fold_event(days, employee_id, direction, scanned_at)
+        with transaction.atomic():
+            claimed = ScanRollupCursor.objects.filter(
+                pk=cursor.pk, last_event_id=cursor.last_event_id
+            ).update(last_event_id=events[-1][0], updated_at=timezone.now())
+            if claimed:
+                apply_punch_days(days)
+                return len(events)
@@ -0,0 +1,117 @@
+"""Shift calendar compiled into minute-of-day lookup tables.
+
+ShiftSchedule rows are loaded once and, per (department, weekday), compiled
+into a table of 1440 entries (one per minute of the day) holding the shift a
+scan at that minute belongs to and when that shift ends, so classifying a scan
+and computing its overtime is a list index. The calendar is cached per process
+for CACHE_SECONDS and dropped whenever a ShiftSchedule is saved or deleted in
+that process; other processes pick up the change when their copy expires.
+
+A scan belongs to the shift in progress (the latest started one when shifts
+overlap), or to the next shift to start when none is. A shift whose end time is
+at or before its start time ends the next day, so night shifts started the
+previous evening are taken into account.
+"""
+
+from collections import defaultdict
+from datetime import time, timedelta
+from time import monotonic
+
+from core.models import ShiftSchedule
+
+MINUTES_PER_DAY = 24 * 60
+CACHE_SECONDS = 60
+
+# Used when no ShiftSchedule rows apply. Night lasts until the Morning shift
+# starts, as before shift schedules: scans from 20:00 to 08:00 are Night, and a
+# night shift only earns overtime after 08:00.
+DEFAULT_SHIFTS = [
+    ("Morning", time(8, 0), time(16, 0)),
+    ("Afternoon", time(12, 0), time(20, 0)),
+    ("Night", time(20, 0), time(8, 0)),
+]
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _spans(shifts, offset):
+    """(start, end, shift) in minutes from midnight of the looked-up day."""
+    spans = []
+    for shift, start_time, end_time in shifts:
+        start, end = _minutes(start_time), _minutes(end_time)
+        if end <= start:
+            end += MINUTES_PER_DAY
+        spans.append((start + offset, end + offset, shift))
+    return spans
+
+
+class ShiftCalendar:
+    """Compiled shift schedules; use :func:`shift_calendar` to get the cached one."""
+
+    def __init__(self, schedules):
+        self._shifts = defaultdict(list)
+        for schedule in schedules:
+            self._shifts[(schedule.department, schedule.weekday)].append(
+                (schedule.shift, schedule.start_time, schedule.end_time)
+            )
+        self._tables = {}
+
+    def shifts_for(self, department, weekday):
+        """The most specific schedule for a department and weekday (0 is Monday)."""
+        for key in ((department, weekday), (department, None), ("", weekday), ("", None)):
+            if key in self._shifts:
+                return self._shifts[key]
+        return DEFAULT_SHIFTS
+
+    def table(self, department, weekday):
+        """The minute-of-day table of ``(shift, end minute)`` for a department and weekday.
+
+        End minutes are counted from midnight of that day and may be negative or
+        exceed one day.
+        """
+        key = (department, weekday)
+        if key not in self._tables:
+            spans = (
+                _spans(self.shifts_for(department, (weekday - 1) % 7), -MINUTES_PER_DAY)
+                + _spans(self.shifts_for(department, weekday), 0)
+                + _spans(self.shifts_for(department, (weekday + 1) % 7), MINUTES_PER_DAY)
+            )
+            table = []
+            for minute in range(MINUTES_PER_DAY):
+                in_progress = [span for span in spans if span[0] <= minute < span[1]]
+                if in_progress:
+                    start, end, shift = max(in_progress)
+                else:
+                    start, end, shift = min(span for span in spans if span[0] > minute)
+                table.append((shift, end))
+            self._tables[key] = table
+        return self._tables[key]
+
+    def lookup(self, department, local_time):
+        """Returns ``(shift, shift_end)`` for a scan at the aware local datetime ``local_time``."""
+        shift, end = self.table(department or "", local_time.weekday())[
+            local_time.hour * 60 + local_time.minute
+        ]
+        midnight = local_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        return shift, midnight + timedelta(minutes=end)
+
+
+_calendar = None
+_loaded_at = 0.0
+
+
+def shift_calendar():
+    """Returns the cached ShiftCalendar, reloading it when it is older than CACHE_SECONDS."""
+    global _calendar, _loaded_at
+    if _calendar is None or monotonic() - _loaded_at > CACHE_SECONDS:
+        _calendar = ShiftCalendar(ShiftSchedule.objects.all())
+        _loaded_at = monotonic()
+    return _calendar
+
+
+def clear_shift_calendar(**kwargs):
+    """Drops the cached calendar; connected to ShiftSchedule saves and deletes."""
+    global _calendar
+    _calendar = None
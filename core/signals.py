@@ -0,0 +1,94 @@
+from datetime import date
+from functools import partial
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+from accounts.models import Employee
+from core.models import Attendance, Bonuses, Deductions, DirtyEmployeeMonth, ShiftSchedule
+from core.shifts import clear_shift_calendar
+from core.summaries import refresh_month_summaries
+
+TRACKED_MODELS = (Attendance, Deductions, Bonuses)
+
+
+def _month_of(value):
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.replace(day=1)
+
+
+def touch_employee_months(pairs):
+    """Refreshes the monthly summaries of the given (employee_id, date) pairs and marks
+    those months as needing a payroll rerun.
+
+    Model signals call this on every save, and once per transaction for deletes.
+    Bulk writes (bulk_create, QuerySet.update) bypass signals and must call it
+    themselves.
+    """
+    months = {(emp_id, _month_of(day)) for emp_id, day in pairs if emp_id and day}
+    if not months:
+        return
+    refresh_month_summaries(months)
+    now = timezone.now()
+    # Re-marking bumps updated_at so a payroll run in progress does not clear it
+    DirtyEmployeeMonth.objects.bulk_create(
+        [
+            DirtyEmployeeMonth(employee_id=emp_id, month_year=month, updated_at=now)
+            for emp_id, month in months
+        ],
+        update_conflicts=True,
+        unique_fields=["employee", "month_year"],
+        update_fields=["updated_at"],
+    )
+
+
+def _remember_month(sender, instance, **kwargs):
+    # Keep the loaded values so moving a row to another month dirties both months
+    instance._tracked_month = (instance.employee_id, instance.date)
+
+
+def _track_save(sender, instance, **kwargs):
+    touch_employee_months(
+        [(instance.employee_id, instance.date), getattr(instance, "_tracked_month", (None, None))]
+    )
+    instance._tracked_month = (instance.employee_id, instance.date)
+
+
+def _refresh_deleted_months(using):
+    """on_commit callback refreshing the months of the rows deleted on ``using``."""
+    connection = transaction.get_connection(using)
+    pairs = connection.__dict__.pop("deleted_employee_months", None)
+    if pairs:
+        touch_employee_months(pairs)
+
+
+def _track_delete(sender, instance, origin=None, using=None, **kwargs):
+    # Rows deleted along with their employee have nothing left to recompute
+    if isinstance(origin, Employee) or (
+        isinstance(origin, QuerySet) and origin.model is Employee
+    ):
+        return
+    pair = (instance.employee_id, instance.date)
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        touch_employee_months([pair])
+        return
+    # Deleting a queryset sends one signal per row: collect the months on the
+    # connection and refresh them once at commit. The first callback to run
+    # refreshes them all and the others find nothing left; registering one per
+    # row keeps a callback alive after a rolled back savepoint or transaction,
+    # whose pairs are then refreshed with the next commit.
+    connection.__dict__.setdefault("deleted_employee_months", set()).add(pair)
+    transaction.on_commit(partial(_refresh_deleted_months, using), using=using)
+
+
+for model in TRACKED_MODELS:
+    post_init.connect(_remember_month, sender=model)
+    post_save.connect(_track_save, sender=model)
+    post_delete.connect(_track_delete, sender=model)
+
+post_save.connect(clear_shift_calendar, sender=ShiftSchedule)
+post_delete.connect(clear_shift_calendar, sender=ShiftSchedule)
@@ -0,0 +1,175 @@
+"""What-if payroll projections.
+
+Salary structures and recent monthly summaries are loaded once into column
+lists (one entry per employee), and scenario rules are applied to whole columns
+at a time. A company-wide projection costs three queries and a few list passes,
+and nothing is written to SalaryCalculations.
+"""
+
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Sum
+from django.utils import timezone
+
+from accounts.models import Employee
+from core.models import EmployeeMonthSummary
+from core.payroll import StructureIndex
+
+ZERO = Decimal("0")
+HUNDRED = Decimal("100")
+CENT = Decimal("0.01")
+
+
+class Scenario:
+    """Rules applied to the salary structures of the employees in ``department``
+    (all departments when empty). Percentages are expressed like 5 for 5%."""
+
+    def __init__(
+        self,
+        department="",
+        raise_percentage=0,
+        overtime_rate_change=0,
+        bonus_percentage_change=0,
+        months=12,
+        basis_months=3,
+    ):
+        self.department = department
+        self.raise_percentage = Decimal(raise_percentage)
+        self.overtime_rate_change = Decimal(overtime_rate_change)
+        self.bonus_percentage_change = Decimal(bonus_percentage_change)
+        self.months = months
+        self.basis_months = basis_months
+
+
+def load_columns(basis_start, basis_end):
+    """Loads every active employee with a salary structure into column lists.
+
+    Salary structures are the ones in force in the month of ``basis_end``. Hours,
+    bonuses and deductions are monthly averages over ``[basis_start, basis_end)``.
+    """
+    basis_months = max(
+        (basis_end.year - basis_start.year) * 12 + basis_end.month - basis_start.month, 1
+    )
+    structures = StructureIndex()
+    activity = {
+        row["employee_id"]: row
+        for row in EmployeeMonthSummary.objects.filter(
+            month_year__gte=basis_start, month_year__lt=basis_end
+        )
+        .order_by()
+        .values("employee_id")
+        .annotate(
+            overtime=Sum("overtime_hours"),
+            bonuses=Sum("bonuses_total"),
+            deductions=Sum("deductions_total"),
+        )
+    }
+
+    columns = {
+        "employee_id": [],
+        "department": [],
+        "basic_salary": [],
+        "overtime_rate": [],
+        "bonus_percentage": [],
+        "overtime_hours": [],
+        "bonuses": [],
+        "deductions": [],
+    }
+    employees = Employee.objects.filter(status__iexact="active").values_list("id", "department")
+    for emp_id, department in employees:
+        structure = structures.resolve(emp_id, basis_end)
+        if structure is None:
+            continue
+        row = activity.get(emp_id, {})
+        columns["employee_id"].append(emp_id)
+        columns["department"].append(department)
+        columns["basic_salary"].append(structure.basic_salary)
+        columns["overtime_rate"].append(structure.overtime_rate)
+        columns["bonus_percentage"].append(structure.bonus_percentage)
+        columns["overtime_hours"].append((row.get("overtime") or ZERO) / basis_months)
+        columns["bonuses"].append((row.get("bonuses") or ZERO) / basis_months)
+        columns["deductions"].append((row.get("deductions") or ZERO) / basis_months)
+    return columns
+
+
+def _monthly_gross(basic, rate, overtime, bonuses):
+    return [b + o * r + x for b, r, o, x in zip(basic, rate, overtime, bonuses)]
+
+
+def simulate(scenario, columns=None, today=None):
+    """Projects baseline and scenario gross/net payroll totals over ``scenario.months``.
+
+    The baseline uses the same formula as payroll generation. A bonus percentage
+    change adds ``basic salary x change`` to each affected employee's monthly bonus.
+    """
+    if columns is None:
+        today = today or timezone.now().date()
+        basis_end = today.replace(day=1)
+        columns = load_columns(basis_end - relativedelta(months=scenario.basis_months), basis_end)
+
+    in_scope = [
+        not scenario.department or department == scenario.department
+        for department in columns["department"]
+    ]
+    raise_factor = 1 + scenario.raise_percentage / HUNDRED
+    rate_factor = 1 + scenario.overtime_rate_change / HUNDRED
+    bonus_points = scenario.bonus_percentage_change / HUNDRED
+
+    basic = columns["basic_salary"]
+    rate = columns["overtime_rate"]
+    overtime = columns["overtime_hours"]
+    bonuses = columns["bonuses"]
+    deductions = columns["deductions"]
+
+    new_basic = [b * raise_factor if m else b for b, m in zip(basic, in_scope)]
+    new_rate = [r * rate_factor if m else r for r, m in zip(rate, in_scope)]
+    new_bonuses = [
+        x + b * bonus_points if m else x for x, b, m in zip(bonuses, new_basic, in_scope)
+    ]
+
+    baseline_gross = _monthly_gross(basic, rate, overtime, bonuses)
+    projected_gross = _monthly_gross(new_basic, new_rate, overtime, new_bonuses)
+
+    departments = {}
+    for department, base, projected, deduction in zip(
+        columns["department"], baseline_gross, projected_gross, deductions
+    ):
+        totals = departments.setdefault(
+            department,
+            {"headcount": 0, "baseline_gross": ZERO, "projected_gross": ZERO, "deductions": ZERO},
+        )
+        totals["headcount"] += 1
+        totals["baseline_gross"] += base
+        totals["projected_gross"] += projected
+        totals["deductions"] += deduction
+
+    months = scenario.months
+    breakdown = []
+    for department in sorted(departments):
+        totals = departments[department]
+        breakdown.append(
+            {
+                "department": department,
+                "headcount": totals["headcount"],
+                "baseline_gross": (totals["baseline_gross"] * months).quantize(CENT),
+                "projected_gross": (totals["projected_gross"] * months).quantize(CENT),
+                "baseline_net": (
+                    (totals["baseline_gross"] - totals["deductions"]) * months
+                ).quantize(CENT),
+                "projected_net": (
+                    (totals["projected_gross"] - totals["deductions"]) * months
+                ).quantize(CENT),
+            }
+        )
+
+    result = {
+        "months": months,
+        "headcount": len(basic),
+        "affected": sum(in_scope),
+        "departments": breakdown,
+    }
+    for key in ("baseline_gross", "projected_gross", "baseline_net", "projected_net"):
+        result[key] = sum((row[key] for row in breakdown), ZERO)
+    result["difference"] = result["projected_gross"] - result["baseline_gross"]
+    return result
@@ -0,0 +1,129 @@
+"""Per-employee monthly totals of attendance, deductions and bonuses.
+
+EmployeeMonthSummary rows are refreshed whenever their source rows change
+(see core.signals), so payroll reads one row per employee instead of scanning
+a month of attendance.
+"""
+
+from collections import defaultdict
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from core.models import Attendance, Bonuses, Deductions, EmployeeMonthSummary
+
+BATCH_SIZE = 500
+
+SUMMARY_FIELDS = [
+    "hours_worked",
+    "overtime_hours",
+    "deductions_total",
+    "bonuses_total",
+    "present_days",
+    "absent_days",
+]
+
+
+def _by_month(queryset, **aggregates):
+    """Groups ``queryset`` by (employee, month) and yields (key, row) pairs."""
+    rows = (
+        queryset.annotate(month=TruncMonth("date"))
+        .order_by()
+        .values("employee_id", "month")
+        .annotate(**aggregates)
+    )
+    for row in rows:
+        yield (row["employee_id"], row["month"]), row
+
+
+def compute_month_totals(date_filter):
+    """Aggregates the source rows matching ``date_filter`` per (employee_id, month)."""
+    totals = defaultdict(dict)
+    attendance = Attendance.objects.filter(date_filter)
+    for key, row in _by_month(
+        attendance,
+        hours=Sum("hours_worked"),
+        overtime=Sum("overtime_hours"),
+        present=Count("id", filter=Q(is_present=True)),
+        absent=Count("id", filter=Q(is_present=False)),
+    ):
+        totals[key].update(
+            hours_worked=row["hours"] or 0,
+            overtime_hours=row["overtime"] or 0,
+            present_days=row["present"],
+            absent_days=row["absent"],
+        )
+    for key, row in _by_month(Deductions.objects.filter(date_filter), amount=Sum("amount")):
+        totals[key]["deductions_total"] = row["amount"] or 0
+    for key, row in _by_month(Bonuses.objects.filter(date_filter), amount=Sum("amount")):
+        totals[key]["bonuses_total"] = row["amount"] or 0
+    return totals
+
+
+def _save(keys, totals):
+    now = timezone.now()
+    summaries = [
+        EmployeeMonthSummary(
+            employee_id=emp_id, month_year=month, updated_at=now, **totals.get((emp_id, month), {})
+        )
+        for emp_id, month in keys
+    ]
+    EmployeeMonthSummary.objects.bulk_create(
+        summaries,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["employee", "month_year"],
+        update_fields=SUMMARY_FIELDS + ["updated_at"],
+    )
+
+
+def refresh_month_summaries(months):
+    """Recomputes the summaries of the given (employee_id, first_of_month) pairs."""
+    employees_by_month = defaultdict(set)
+    for emp_id, month in months:
+        employees_by_month[month].add(emp_id)
+    if not employees_by_month:
+        return
+
+    date_filter = Q()
+    for month, emp_ids in employees_by_month.items():
+        date_filter |= Q(
+            employee_id__in=emp_ids, date__gte=month, date__lt=month + relativedelta(months=1)
+        )
+    _save(months, compute_month_totals(date_filter))
+
+
+def rebuild_month_summaries(start=None, end=None):
+    """Rebuilds all summaries for months in ``[start, end)``, or for the whole history.
+
+    Runs one month at a time so memory stays bounded. Returns the number of rows written.
+    """
+    if start is None or end is None:
+        bounds = [
+            model.objects.aggregate(first=Min("date"), last=Max("date"))
+            for model in (Attendance, Deductions, Bonuses)
+        ]
+        firsts = [b["first"] for b in bounds if b["first"]]
+        lasts = [b["last"] for b in bounds if b["last"]]
+        if not firsts:
+            EmployeeMonthSummary.objects.all().delete()
+            return 0
+        start = start or min(firsts).replace(day=1)
+        end = end or max(lasts).replace(day=1) + relativedelta(months=1)
+        # Months without any source rows left
+        EmployeeMonthSummary.objects.exclude(month_year__gte=start, month_year__lt=end).delete()
+
+    written = 0
+    month = start
+    while month < end:
+        next_month = month + relativedelta(months=1)
+        totals = compute_month_totals(Q(date__gte=month, date__lt=next_month))
+        with transaction.atomic():
+            EmployeeMonthSummary.objects.filter(month_year=month).delete()
+            _save(totals.keys(), totals)
+        written += len(totals)
+        month = next_month
+    return written
@@ -1,3 +1,604 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import Account, Employee
+from core import exports, scans
+from core.jobs import claim_next_job
+from core.money import _div_round, from_minor, overtime_pay, salary_totals, to_minor
+from core.models import (
+    Attendance,
+    Bonuses,
+    DirtyEmployeeMonth,
+    EmployeeMonthSummary,
+    ExportJob,
+    SalaryCalculations,
+    SalaryStructure,
+    ScanEvent,
+    ScanRollupCursor,
+    ShiftSchedule,
+)
+from core.payroll import StructureIndex, generate_payroll, generate_payroll_range
+from core.scans import LOCAL_TZ, apply_punch_days, fold_event, roll_up_scan_events
+from core.shifts import MINUTES_PER_DAY, ShiftCalendar, shift_calendar
+from core.signals import touch_employee_months
+
+
+def make_employee(name="Employee", department=""):
+    return Employee.objects.create(
+        name=name,
+        position="Staff",
+        department=department,
+        contact_number="020",
+        bank_account_num="000",
+        employment_date=date(2020, 1, 1),
+    )
+
+
+def local_time(*args):
+    return datetime(*args, tzinfo=LOCAL_TZ)
+
+
+class ScanRollupTests(TestCase):
+    def setUp(self):
+        self.employee = make_employee()
+
+    def scan(self, direction, scanned_at):
+        ScanEvent.objects.create(employee=self.employee, direction=direction, scanned_at=scanned_at)
+
+    def test_night_shift_pairs_across_midnight(self):
+        self.scan("IN", local_time(2026, 3, 2, 22, 0))
+        self.scan("OUT", local_time(2026, 3, 3, 6, 0))
+        self.assertEqual(roll_up_scan_events(), 2)
+
+        attendance = Attendance.objects.get(employee=self.employee)
+        self.assertEqual(attendance.date, date(2026, 3, 2))
+        self.assertEqual(attendance.scan_out_time, local_time(2026, 3, 3, 6, 0))
+        self.assertEqual(attendance.hours_worked, Decimal("8.00"))
+        # The default Night shift ends at 08:00
+        self.assertEqual(attendance.shift, "Night")
+        self.assertEqual(attendance.overtime_hours, Decimal("0.00"))
+
+    def test_night_overtime_with_the_default_shifts(self):
+        self.scan("IN", local_time(2026, 3, 2, 20, 0))
+        self.scan("OUT", local_time(2026, 3, 3, 9, 15))
+        roll_up_scan_events()
+
+        attendance = Attendance.objects.get(employee=self.employee)
+        self.assertEqual(attendance.hours_worked, Decimal("13.25"))
+        self.assertEqual(attendance.overtime_hours, Decimal("1.25"))
+
+    def test_scan_out_closes_shift_rolled_up_earlier(self):
+        self.scan("IN", local_time(2026, 3, 2, 22, 0))
+        roll_up_scan_events()
+        self.scan("OUT", local_time(2026, 3, 3, 6, 30))
+        self.scan("IN", local_time(2026, 3, 3, 22, 0))
+        roll_up_scan_events()
+
+        night, next_night = Attendance.objects.filter(employee=self.employee).order_by("date")
+        self.assertEqual(night.scan_out_time, local_time(2026, 3, 3, 6, 30))
+        self.assertEqual(night.hours_worked, Decimal("8.50"))
+        self.assertEqual(next_night.scan_in_time, local_time(2026, 3, 3, 22, 0))
+        self.assertIsNone(next_night.scan_out_time)
+
+    def test_scan_out_after_open_shift_window_is_ignored(self):
+        self.scan("IN", local_time(2026, 3, 1, 22, 0))
+        roll_up_scan_events()
+        self.scan("OUT", local_time(2026, 3, 3, 6, 0))
+        roll_up_scan_events()
+
+        attendance = Attendance.objects.get(employee=self.employee)
+        self.assertEqual(attendance.date, date(2026, 3, 1))
+        self.assertIsNone(attendance.scan_out_time)
+
+    def test_punches_merge_with_existing_rows_of_their_days_only(self):
+        other = make_employee("Other")
+        days = {}
+        for employee in (self.employee, other):
+            for day in range(1, 181):  # More keys than one lookup query takes
+                scan_in = local_time(2025, 1, 1, 8, 0) + timedelta(days=day)
+                Attendance.objects.create(
+                    employee=employee, date=scan_in.date(), shift="Morning", scan_in_time=scan_in
+                )
+                if employee == self.employee:
+                    fold_event(days, employee.pk, "OUT", scan_in + timedelta(hours=8))
+
+        self.assertEqual(apply_punch_days(days), (0, 180))
+        attendance = Attendance.objects.filter(hours_worked=Decimal("8.00"))
+        self.assertEqual(attendance.count(), 180)
+        self.assertFalse(attendance.filter(employee=other).exists())
+
+    def test_batch_claimed_by_a_concurrent_rollup_is_not_applied_twice(self):
+        self.scan("IN", local_time(2026, 3, 2, 8, 0))
+        first_batch = ScanEvent.objects.get().pk
+        self.scan("OUT", local_time(2026, 3, 2, 17, 0))
+        second_batch = ScanEvent.objects.latest("pk").pk
+
+        def concurrent_rollup(*args):
+            # Another rollup claims the first event while this one folds it
+            if not ScanRollupCursor.objects.filter(last_event_id=first_batch).exists():
+                ScanRollupCursor.objects.update(last_event_id=first_batch)
+            return fold_event(*args)
+
+        with mock.patch.object(scans, "fold_event", side_effect=concurrent_rollup):
+            self.assertEqual(roll_up_scan_events(batch_size=1), 1)
+        self.assertEqual(ScanRollupCursor.objects.get().last_event_id, second_batch)
+        # Only the OUT was applied here; the IN belonged to the other rollup
+        self.assertFalse(Attendance.objects.exists())
+
+
+class DirectScanTests(TestCase):
+    def setUp(self):
+        self.employee = make_employee()
+
+    async def test_repeated_scan_out_after_a_night_shift(self):
+        employee_id = self.employee.pk
+        scanned_in = await scans.arecord_scan_in(employee_id, now=local_time(2026, 3, 2, 22, 0))
+        self.assertEqual(scanned_in.status, scans.SCANNED_IN)
+        scanned_out = await scans.arecord_scan_out(employee_id, now=local_time(2026, 3, 3, 6, 0))
+        self.assertEqual(scanned_out.status, scans.SCANNED_OUT)
+        self.assertEqual(scanned_out.overtime, Decimal("0.00"))
+
+        again = await scans.arecord_scan_out(employee_id, now=local_time(2026, 3, 3, 6, 5))
+        self.assertEqual(again.status, scans.ALREADY_SCANNED_OUT)
+        later = await scans.arecord_scan_out(employee_id, now=local_time(2026, 3, 3, 23, 0))
+        self.assertEqual(later.status, scans.NOT_SCANNED_IN)
+
+
+class KioskSyncTests(TestCase):
+    def setUp(self):
+        self.employee = make_employee()
+
+    def event(self, key, employee_id=None, hour=8):
+        return (key, employee_id or self.employee.pk, "IN", local_time(2026, 3, 2, hour, 0))
+
+    def test_replayed_and_repeated_keys_are_recorded_once(self):
+        self.assertEqual(scans.record_scan_events([self.event("a")]), (1, [], []))
+        events = [self.event("a"), self.event("b"), self.event("b", hour=9)]
+        self.assertEqual(scans.record_scan_events(events), (1, ["a", "b"], []))
+        self.assertEqual(ScanEvent.objects.count(), 2)
+        recorded = ScanEvent.objects.get(idempotency_key="b")
+        self.assertEqual(recorded.scanned_at, local_time(2026, 3, 2, 8, 0))
+
+    def test_events_of_unknown_employees_are_skipped(self):
+        result = scans.record_scan_events([self.event("a"), self.event("b", self.employee.pk + 1)])
+        self.assertEqual(result, (1, [], ["b"]))
+        self.assertFalse(ScanEvent.objects.filter(idempotency_key="b").exists())
+
+    def test_keys_recorded_by_a_concurrent_sync_are_duplicates(self):
+        atomic_blocks = []
+
+        def racing_atomic():
+            # Another sync commits "b" after this one looked up the recorded keys,
+            # just before the insert
+            atomic_blocks.append(None)
+            if len(atomic_blocks) == 2:
+                ScanEvent.objects.create(
+                    idempotency_key="b",
+                    employee=self.employee,
+                    direction="IN",
+                    scanned_at=local_time(2026, 3, 2, 8, 0),
+                )
+            return transaction.atomic()
+
+        with mock.patch.object(scans, "transaction", SimpleNamespace(atomic=racing_atomic)):
+            result = scans.record_scan_events([self.event("a"), self.event("b"), self.event("c")])
+        self.assertEqual(result, (2, ["b"], []))
+        self.assertEqual(ScanEvent.objects.count(), 3)
+
+
+class ConcurrentScanInTests(TransactionTestCase):
+    # Not TestCase: the IntegrityError must not happen inside a test transaction
+
+    def setUp(self):
+        self.employee = make_employee()
+        self.create = Attendance.objects.acreate
+
+    async def scan_in_racing(self, scan_in_time):
+        """Scans in at 08:05 while another write creates today's row first."""
+
+        async def racing_create(**values):
+            await self.create(
+                employee_id=self.employee.pk,
+                date=date(2026, 3, 2),
+                shift="Absent" if scan_in_time is None else "Morning",
+                is_present=scan_in_time is not None,
+                scan_in_time=scan_in_time,
+            )
+            return await self.create(**values)
+
+        with mock.patch.object(Attendance.objects, "acreate", side_effect=racing_create):
+            return await scans.arecord_scan_in(self.employee.pk, now=local_time(2026, 3, 2, 8, 5))
+
+    async def test_first_scan_in_wins(self):
+        result = await self.scan_in_racing(local_time(2026, 3, 2, 8, 0))
+        self.assertEqual(result.status, scans.ALREADY_SCANNED_IN)
+        rows = [row async for row in Attendance.objects.filter(employee=self.employee)]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].scan_in_time, local_time(2026, 3, 2, 8, 0))
+
+    async def test_scan_in_fills_a_row_created_without_one(self):
+        result = await self.scan_in_racing(None)
+        self.assertEqual(result.status, scans.SCANNED_IN)
+        rows = [row async for row in Attendance.objects.filter(employee=self.employee)]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].scan_in_time, local_time(2026, 3, 2, 8, 5))
+        self.assertTrue(rows[0].is_present)
+
+class ExportCacheTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def run_export(self, export):
+        job = exports.request_export(export, {})
+        if job.status == "QUEUED":
+            exports.run_export_job(claim_next_job(ExportJob))
+            job.refresh_from_db()
+        return job
+
+    def test_unchanged_export_is_served_from_cache(self):
+        make_employee()
+        job = self.run_export(exports.SALARY_STRUCTURES)
+        self.assertEqual(self.run_export(exports.SALARY_STRUCTURES), job)
+
+    def test_amounts_keep_their_decimals(self):
+        employee = make_employee()
+        SalaryStructure.objects.create(
+            employee=employee,
+            basic_salary=Decimal("1250000.50"),
+            overtime_rate=Decimal("12345.67"),
+            bonus_percentage=0,
+        )
+        job = self.run_export(exports.SALARY_STRUCTURES)
+        cell = openpyxl.load_workbook(job.file.path).active["C2"]
+        self.assertEqual((cell.value, cell.number_format), (1250000.5, "#,##0.00"))
+
+    def test_only_numeric_filters_are_normalized(self):
+        params = {"year": " 2026", "month": "03", "employee": "007", "status": "PAID"}
+        self.assertEqual(
+            exports.SALARY_CALCULATIONS.clean_filters(params),
+            {"year": "2026", "month": "3", "employee": "7", "status": "PAID"},
+        )
+        self.assertEqual(exports.EMPLOYEES.clean_filters({"search": " 007 "}), {"search": "007"})
+
+    def test_account_columns_are_not_cached(self):
+        employee = make_employee()
+        employee.user = Account.objects.create_user("old@example.com")
+        employee.save()
+        job = self.run_export(exports.EMPLOYEES)
+
+        Account.objects.filter(pk=employee.user_id).update(email="new@example.com")
+        fresh = self.run_export(exports.EMPLOYEES)
+        self.assertNotEqual(fresh, job)
+        rows = openpyxl.load_workbook(fresh.file.path).active.iter_rows(values_only=True)
+        self.assertEqual(list(rows)[1][2], "new@example.com")
+
+    def test_superseded_jobs_are_kept_for_their_clients(self):
+        make_employee()
+        first = self.run_export(exports.EMPLOYEES)
+        second = self.run_export(exports.EMPLOYEES)
+        self.assertTrue(ExportJob.objects.filter(pk=first.pk, status="DONE").exists())
+
+        requested = timezone.now() - exports.SUPERSEDED_JOB_GRACE - timedelta(minutes=1)
+        ExportJob.objects.filter(pk__in=[first.pk, second.pk]).update(created_at=requested)
+        third = self.run_export(exports.EMPLOYEES)
+        self.assertEqual(
+            list(ExportJob.objects.order_by("pk").values_list("pk", flat=True)), [third.pk]
+        )
+
+    def test_old_jobs_of_replaced_data_versions_are_deleted(self):
+        employee = make_employee()
+        structure = SalaryStructure.objects.create(
+            employee=employee, basic_salary=1000000, overtime_rate=10000, bonus_percentage=0
+        )
+        old = self.run_export(exports.SALARY_STRUCTURES)
+        ExportJob.objects.update(created_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.run_export(exports.SALARY_STRUCTURES), old)
+
+        structure.basic_salary = 1200000
+        structure.save()
+        new = self.run_export(exports.SALARY_STRUCTURES)
+        self.assertEqual(list(ExportJob.objects.values_list("pk", flat=True)), [new.pk])
+
+
+CENT = Decimal("0.01")
+
+
+def decimal_totals(basic_salary, overtime_hours, overtime_rate, bonuses, deductions):
+    """Gross and net as payroll computed them with Decimal before minor units, as
+    stored by the two-place DecimalFields (half to even)."""
+    amounts = map(Decimal, (basic_salary, overtime_hours, overtime_rate, bonuses, deductions))
+    basic_salary, overtime_hours, overtime_rate, bonuses, deductions = amounts
+    gross = basic_salary + overtime_hours * overtime_rate + bonuses
+    return gross.quantize(CENT), (gross - deductions).quantize(CENT)
+
+
+class MoneyTests(SimpleTestCase):
+    def test_div_round_rounds_half_away_from_zero(self):
+        self.assertEqual(_div_round(124, 10), 12)
+        self.assertEqual(_div_round(125, 10), 13)
+        self.assertEqual(_div_round(-125, 10), -13)
+        self.assertEqual(_div_round(-124, 10), -12)
+
+    def test_overtime_pay_matches_decimal_results(self):
+        for hours in ("0.00", "0.01", "1.25", "7.33", "12.50", "99.99"):
+            for rate in ("0.07", "333.33", "10000.00", "12500.50"):
+                product = Decimal(hours) * Decimal(rate)
+                with self.subTest(hours=hours, rate=rate):
+                    pay = from_minor(overtime_pay(to_minor(hours), to_minor(rate)))
+                    self.assertEqual(pay, product.quantize(CENT, rounding=ROUND_HALF_UP))
+                    if product.scaleb(2) % 1 != Decimal("0.5"):
+                        self.assertEqual(pay, product.quantize(CENT))
+
+    def test_half_cent_overtime_rounds_up(self):
+        # The Decimal results were stored half to even: 0.125 kip became 0.12
+        self.assertEqual(overtime_pay(to_minor("0.50"), to_minor("0.25")), 13)
+        self.assertEqual(overtime_pay(to_minor("0.50"), to_minor("0.75")), 38)
+
+    def test_salary_totals_match_decimal_results(self):
+        cases = [
+            ("1000000.00", "7.50", "10000.00", "70000.00", "50000.00"),
+            ("2500000.00", "0.00", "15000.00", "0.00", "0.00"),
+            ("1850000.50", "13.33", "12345.67", "125000.25", "99999.99"),
+            ("900000.00", "2.00", "8000.00", "0.00", "950000.00"),  # Negative net
+        ]
+        for case in cases:
+            with self.subTest(case=case):
+                gross, net = salary_totals(*map(to_minor, case))
+                self.assertEqual((from_minor(gross), from_minor(net)), decimal_totals(*case))
+
+
+class StructureIndexTests(TestCase):
+    def setUp(self):
+        self.employee = make_employee()
+
+    def structure(self, effective_from, effective_to):
+        return SalaryStructure.objects.create(
+            employee=self.employee,
+            basic_salary=1000000,
+            overtime_rate=10000,
+            bonus_percentage=0,
+            effective_from=effective_from,
+            effective_to=effective_to,
+        )
+
+    def resolve(self, month):
+        return StructureIndex().resolve(self.employee.pk, month)
+
+    def test_structure_applies_through_its_last_day(self):
+        march = self.structure(date(2026, 1, 1), date(2026, 3, 31))
+        april = self.structure(date(2026, 4, 1), None)
+        self.assertEqual(self.resolve(date(2026, 3, 1)), march)
+        self.assertEqual(self.resolve(date(2026, 4, 1)), april)
+
+    def test_structure_ending_on_the_first_day_applies_to_that_month(self):
+        ending = self.structure(date(2026, 1, 1), date(2026, 4, 1))
+        self.assertEqual(self.resolve(date(2026, 4, 1)), ending)
+        self.assertIsNone(self.resolve(date(2026, 5, 1)))
+
+    def test_structure_starting_on_the_last_day_applies_to_that_month(self):
+        earlier = self.structure(date(2026, 1, 1), date(2026, 4, 29))
+        later = self.structure(date(2026, 4, 30), None)
+        self.assertEqual(self.resolve(date(2026, 4, 1)), later)
+        self.assertEqual(self.resolve(date(2026, 3, 1)), earlier)
+
+    def test_months_in_a_gap_have_no_structure(self):
+        before = self.structure(date(2026, 1, 1), date(2026, 2, 28))
+        after = self.structure(date(2026, 5, 1), date(2026, 12, 31))
+        self.assertEqual(self.resolve(date(2026, 2, 1)), before)
+        self.assertIsNone(self.resolve(date(2026, 3, 1)))
+        self.assertIsNone(self.resolve(date(2026, 4, 1)))
+        self.assertEqual(self.resolve(date(2026, 5, 1)), after)
+        self.assertIsNone(self.resolve(date(2027, 1, 1)))
+
+    def test_open_ended_structures(self):
+        open_start = self.structure(None, date(2025, 12, 31))
+        open_end = self.structure(date(2026, 1, 1), None)
+        self.assertEqual(self.resolve(date(1990, 1, 1)), open_start)
+        self.assertEqual(self.resolve(date(2026, 1, 1)), open_end)
+        self.assertEqual(self.resolve(date(2099, 12, 1)), open_end)
+        self.assertIsNone(StructureIndex().resolve(make_employee("Other").pk, date(2026, 1, 1)))
+
+
+def schedule(shift, start, end, department="", weekday=None):
+    return ShiftSchedule(
+        shift=shift, start_time=start, end_time=end, department=department, weekday=weekday
+    )
+
+
+class ShiftCalendarTests(SimpleTestCase):
+    # 2026-03-02 is a Monday
+
+    def test_tables_cover_every_minute(self):
+        table = ShiftCalendar([]).table("", 0)
+        self.assertEqual(len(table), MINUTES_PER_DAY)
+
+    def test_default_shifts(self):
+        calendar = ShiftCalendar([])
+        cases = [
+            ((2026, 3, 2, 9, 0), "Morning", (2026, 3, 2, 16, 0)),
+            # Overlapping shifts: the one started last
+            ((2026, 3, 2, 13, 0), "Afternoon", (2026, 3, 2, 20, 0)),
+            ((2026, 3, 2, 21, 0), "Night", (2026, 3, 3, 8, 0)),
+            # Started the previous evening
+            ((2026, 3, 2, 2, 0), "Night", (2026, 3, 2, 8, 0)),
+            ((2026, 3, 2, 7, 59), "Night", (2026, 3, 2, 8, 0)),
+        ]
+        for scanned_at, shift, end in cases:
+            with self.subTest(scanned_at=scanned_at):
+                self.assertEqual(
+                    calendar.lookup("", local_time(*scanned_at)), (shift, local_time(*end))
+                )
+
+    def test_night_shift_continues_into_a_day_without_it(self):
+        calendar = ShiftCalendar(
+            [
+                schedule("Morning", time(8, 0), time(17, 0), "IT"),
+                schedule("Night", time(22, 0), time(6, 0), "IT", weekday=0),
+            ]
+        )
+        self.assertEqual(
+            calendar.lookup("IT", local_time(2026, 3, 2, 23, 0)),
+            ("Night", local_time(2026, 3, 3, 6, 0)),
+        )
+        self.assertEqual(
+            calendar.lookup("IT", local_time(2026, 3, 3, 3, 0)),
+            ("Night", local_time(2026, 3, 3, 6, 0)),
+        )
+        # Tuesday has no night shift of its own
+        self.assertEqual(
+            calendar.lookup("IT", local_time(2026, 3, 3, 23, 0)),
+            ("Morning", local_time(2026, 3, 4, 17, 0)),
+        )
+
+    def test_most_specific_schedule_wins(self):
+        calendar = ShiftCalendar(
+            [
+                schedule("Morning", time(7, 0), time(15, 0)),
+                schedule("Morning", time(8, 0), time(16, 0), "IT"),
+                schedule("Morning", time(9, 0), time(13, 0), "IT", weekday=5),
+            ]
+        )
+        self.assertEqual(calendar.lookup("HR", local_time(2026, 3, 7, 10, 0))[1].hour, 15)
+        self.assertEqual(calendar.lookup("IT", local_time(2026, 3, 2, 10, 0))[1].hour, 16)
+        self.assertEqual(calendar.lookup("IT", local_time(2026, 3, 7, 10, 0))[1].hour, 13)
+
+
+class ShiftCalendarCacheTests(TestCase):
+    def test_saving_or_deleting_a_schedule_drops_the_cached_calendar(self):
+        monday_nine = local_time(2026, 3, 2, 9, 0)
+        self.assertEqual(shift_calendar().lookup("", monday_nine)[1].hour, 16)
+
+        saved = schedule("Morning", time(9, 0), time(18, 0))
+        saved.save()
+        self.assertEqual(shift_calendar().lookup("", monday_nine)[1].hour, 18)
+
+        saved.delete()
+        self.assertEqual(shift_calendar().lookup("", monday_nine)[1].hour, 16)
+
+
+class DeleteTrackingTests(TestCase):
+    def setUp(self):
+        self.employee = make_employee()
+        for day in range(60):
+            Attendance.objects.create(
+                employee=self.employee,
+                date=date(2026, 3, 1) + timedelta(days=day),
+                shift="Morning",
+                hours_worked=8,
+            )
+
+    def summary(self, month):
+        return EmployeeMonthSummary.objects.get(employee=self.employee, month_year=month)
+
+    def delete_queries(self, queryset):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                queryset.delete()
+        return len(queries)
+
+    def test_queryset_delete_refreshes_each_month_once(self):
+        self.assertEqual(self.summary(date(2026, 4, 1)).hours_worked, Decimal("232.00"))
+        DirtyEmployeeMonth.objects.all().delete()
+
+        few = self.delete_queries(Attendance.objects.filter(date__lt=date(2026, 3, 3)))
+        many = self.delete_queries(Attendance.objects.filter(date__gte=date(2026, 4, 20)))
+        self.assertEqual(few, many)
+
+        self.assertEqual(self.summary(date(2026, 3, 1)).hours_worked, Decimal("232.00"))
+        self.assertEqual(self.summary(date(2026, 4, 1)).hours_worked, Decimal("152.00"))
+        self.assertEqual(DirtyEmployeeMonth.objects.count(), 2)
+
+    def test_deletes_after_a_rollback_are_refreshed_once(self):
+        with mock.patch("core.signals.touch_employee_months", wraps=touch_employee_months) as touch:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        Attendance.objects.filter(date__lt=date(2026, 4, 1)).delete()
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                Attendance.objects.filter(date=date(2026, 4, 1)).delete()
+        touch.assert_called_once()
+        self.assertEqual(self.summary(date(2026, 3, 1)).hours_worked, Decimal("248.00"))
+        self.assertEqual(self.summary(date(2026, 4, 1)).hours_worked, Decimal("224.00"))
+        self.assertNotIn("deleted_employee_months", connection.__dict__)
+
+
+class PayrollWriteTests(TestCase):
+    MARCH = date(2026, 3, 1)
+
+    def setUp(self):
+        self.employee = make_employee("Somchai")
+        SalaryStructure.objects.create(
+            employee=self.employee, basic_salary=1000000, overtime_rate=10000, bonus_percentage=0
+        )
+        Attendance.objects.create(
+            employee=self.employee,
+            date=date(2026, 3, 2),
+            shift="Morning",
+            hours_worked=Decimal("9.00"),
+            overtime_hours=Decimal("1.50"),
+        )
+        generate_payroll(2026, 3)
+        self.calculation = SalaryCalculations.objects.get()
+        self.assertEqual(self.calculation.gross_salary, Decimal("1015000.00"))
+
+    def pay(self):
+        paid_at = timezone.now()
+        SalaryCalculations.objects.update(status="PAID", paid_at=paid_at, payment_method="CASH")
+        return paid_at
+
+    def test_unchanged_rows_are_left_untouched(self):
+        paid_at = self.pay()
+        result = generate_payroll(2026, 3)
+
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 0, 1))
+        calculation = SalaryCalculations.objects.get()
+        self.assertEqual(calculation.status, "PAID")
+        self.assertEqual(calculation.paid_at, paid_at)
+        self.assertEqual(calculation.payment_method, "CASH")
+        self.assertEqual(calculation.generated_at, self.calculation.generated_at)
+        self.assertEqual(result.reset_paid, [])
+
+    def test_changed_paid_rows_go_back_to_pending(self):
+        self.pay()
+        Bonuses.objects.create(
+            employee=self.employee, date=date(2026, 3, 5), reason="Bonus", amount=50000
+        )
+        result = generate_payroll(2026, 3)
+
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 1, 0))
+        self.assertEqual(result.reset_paid, [("Somchai", self.MARCH)])
+        calculation = SalaryCalculations.objects.get()
+        self.assertEqual(calculation.gross_salary, Decimal("1065000.00"))
+        self.assertEqual(calculation.status, "PENDING")
+        self.assertIsNone(calculation.paid_at)
+        self.assertIsNone(calculation.payment_method)
+        self.assertGreater(calculation.generated_at, self.calculation.generated_at)
+
+    def test_months_dirtied_during_a_run_stay_dirty(self):
+        other = make_employee("Other")
+        touch_employee_months([(other.pk, date(2026, 3, 9))])
+        april = date(2026, 4, 9)
+
+        def progress(processed, total):
+            # A scan recorded while the run writes its rows
+            if processed:
+                touch_employee_months([(self.employee.pk, april)])
+
+        generate_payroll_range(self.MARCH, date(2026, 4, 1), progress=progress)
+        self.assertEqual(
+            list(DirtyEmployeeMonth.objects.values_list("employee_id", "month_year")),
+            [(self.employee.pk, date(2026, 4, 1))],
+        )
@@ -11,6 +11,8 @@ urlpatterns = [
     path("contact/", core_views.contact, name="contact"),
     path("scan-in/", core_views.scan_in, name="scan-in"),
     path("scan-out/", core_views.scan_out, name="scan-out"),
+    path("api/kiosk/scan/", core_views.kiosk_scan, name="kiosk-scan"),
+    path("api/kiosk/sync/", core_views.kiosk_sync, name="kiosk-sync"),
     # Dashboard
     path("dashboard/", core_views.dashboard, name="dashboard"),
     # Users
@@ -80,12 +82,37 @@ urlpatterns = [
     path("dashboard/manage-products/", core_views.manage_products, name="manage-products"),
     # NOTE: Attendance
     path("dashboard/manage-attendance/", core_views.manage_attendance, name="manage-attendance"),
+    path(
+        "dashboard/manage-attendance/import-logs/",
+        core_views.import_attendance_logs,
+        name="import-attendance-logs",
+    ),
     # NOTE: Salary Calculations
     path(
         "dashboard/manage-salary-calculations/",
         core_views.manage_salary_calculations,
         name="manage-salary-calculations",
     ),
+    path(
+        "dashboard/payroll-simulator/",
+        core_views.payroll_simulator,
+        name="payroll-simulator",
+    ),
+    path(
+        "dashboard/shift-schedules/",
+        core_views.manage_shift_schedules,
+        name="manage-shift-schedules",
+    ),
+    path(
+        "dashboard/shift-schedules/<int:pk>/delete/",
+        core_views.delete_shift_schedule,
+        name="delete-shift-schedule",
+    ),
+    path(
+        "dashboard/payroll-jobs/<int:pk>/status/",
+        core_views.payroll_job_status,
+        name="payroll-job-status",
+    ),
     path(
         "dashboard/manage-salary-calculations/<int:pk>/view/",
         core_views.view_salary_calculation,
@@ -117,6 +144,17 @@ urlpatterns = [
         core_views.export_deductions_to_excel,
         name="export-deductions-excel",
     ),
+    path("dashboard/exports/<int:pk>/", core_views.export_job, name="export-job"),
+    path(
+        "dashboard/exports/<int:pk>/status/",
+        core_views.export_job_status,
+        name="export-job-status",
+    ),
+    path(
+        "dashboard/exports/<int:pk>/download/",
+        core_views.download_export_job,
+        name="download-export-job",
+    ),
     path(
         "dashboard/manage-bonuses/export-excel/",
         core_views.export_bonuses_to_excel,
@@ -132,4 +170,9 @@ urlpatterns = [
         core_views.export_salary_calculations_to_excel,
         name="export-salary-calculations-excel",
     ),
+    path(
+        "dashboard/manage-salary-calculations/export-payroll-pack/",
+        core_views.export_payroll_pack,
+        name="export-payroll-pack",
+    ),
 ]
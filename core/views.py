@@ -1,36 +1,57 @@
 import calendar
-from datetime import time
-from decimal import Decimal
+import hmac
+import json
+import zipfile
+from datetime import datetime
 
-import openpyxl
-import pytz
+from asgiref.sync import sync_to_async
 from dateutil.relativedelta import relativedelta  # Added for month iteration
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.hashers import make_password
+from django.contrib.auth.views import redirect_to_login
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import IntegrityError
 from django.db.models import Q, Sum
-from django.http import HttpResponse, JsonResponse, QueryDict
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse, QueryDict
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
-from openpyxl.styles import Alignment, Font
+from django.views.decorators.http import require_POST
 
 from accounts.models import Account, Employee
 from core.models import (
     Attendance,
     Bonuses,
     Deductions,
+    ExportJob,
+    PayrollJob,
     SalaryCalculations,
     SalaryStructure,
+    ShiftSchedule,
 )
 
+from . import exports, scans
+from .filters import (
+    filter_salary_calculations,
+    search_adjustments,
+    search_attendance,
+    search_employees,
+    search_salary_structures,
+)
 from .forms import (
     BonusesForm,
     DeductionsForm,
     EmployeeForm,
+    PayrollSimulationForm,
     SalaryCalculationsForm,
     SalaryStructureForm,
+    ShiftScheduleForm,
 )
+from .payroll import month_range
+from .scan_logs import ScanLogImportError, import_scan_logs
+from .shifts import CACHE_SECONDS as SHIFT_CACHE_SECONDS
+from .simulation import Scenario, simulate
 
 
 def custom_404_view(request, exception):
@@ -57,129 +78,176 @@ def contact(request):
     return render(request, "core/clients/pages/contact.html")
 
 
-@login_required
-def scan_in(request):
-    if request.method == "POST":
-        user = request.user
-        employee = get_object_or_404(Employee, user=user)
+async def _auser(request):
+    """Resolves the lazy ``request.user`` without touching the database from async code."""
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+async def _aemployee(user):
+    """Async counterpart of ``get_object_or_404(Employee, user=user)``, returning
+    only the ``(id, department)`` the scans need."""
+    employee = await (
+        Employee.objects.filter(user_id=user.pk).values_list("id", "department").afirst()
+    )
+    if employee is None:
+        raise Http404("No Employee matches the given query.")
+    return employee
 
-        # Set the timezone to Asia/Vientiane
-        tz = pytz.timezone("Asia/Vientiane")
-        now = timezone.now().astimezone(tz)
-        today = now.date()
-        current_time = now.time()
-
-        # Define shift times
-        morning_start = time(8, 0)
-        afternoon_start = time(12, 0)
-        night_start = time(20, 0)
-        work_end = time(16, 0)
-        # day_end = time(23, 59, 59)
-
-        # Determine shift
-        if morning_start <= current_time < afternoon_start:
-            shift = "Morning"
-        elif afternoon_start <= current_time < night_start:
-            shift = "Afternoon"
-        else:
-            shift = "Night"
-
-        # Check if it's past work hours
-        is_overtime = current_time > work_end
-
-        # Create or get attendance record
-        attendance, created = Attendance.objects.get_or_create(
-            employee=employee,
-            date=today,
-            defaults={
-                "shift": shift,
-                "hours_worked": 0,
-                "overtime_hours": 0,
-                "is_present": True,
-                "scan_in_time": now,
-            },
-        )
 
-        if not created:
-            if attendance.scan_in_time:
-                messages.warning(request, "You have already scanned in today.")
-            else:
-                attendance.scan_in_time = now
-                attendance.shift = shift
-                attendance.is_present = True
-                attendance.save()
-                messages.success(request, f"Scan in successful. Shift: {shift}")
+async def scan_in(request):
+    # login_required and render are sync-only in Django 4.2
+    user = await _auser(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+
+    if request.method == "POST":
+        result = await scans.arecord_scan_in(*await _aemployee(user))
+
+        if result.status == scans.ALREADY_SCANNED_IN:
+            messages.warning(request, "You have already scanned in today.")
         else:
-            messages.success(request, f"Scan in successful. Shift: {shift}")
-
-        # If scanning in after work hours, log overtime
-        if is_overtime:
-            # attendance.overtime_hours = (
-            #     now - now.replace(hour=16, minute=0, second=0, microsecond=0)
-            # ).total_seconds() / 3600
-            # attendance.save()
-            messages.info(
-                request, "You are scanning in after regular work hours. Overtime will be logged."
-            )
+            messages.success(request, f"Scan in successful. Shift: {result.shift}")
 
         return redirect("home")  # Redirect to an attendance list view
 
     # return render(request, "core/scan_in.html")
-    return render(request, "core/clients/pages/home.html")
+    return await sync_to_async(render)(request, "core/clients/pages/home.html")
 
 
-@login_required
-def scan_out(request):
-    if request.method == "POST":
-        user = request.user
-        employee = get_object_or_404(Employee, user=user)
+async def scan_out(request):
+    user = await _auser(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
 
-        # Set the timezone to Asia/Vientiane
-        tz = pytz.timezone("Asia/Vientiane")
-        now = timezone.now().astimezone(tz)
-        today = now.date()
+    if request.method == "POST":
+        result = await scans.arecord_scan_out(*await _aemployee(user))
 
-        try:
-            attendance = Attendance.objects.get(employee=employee, date=today)
-
-            if not attendance.scan_in_time:
-                messages.error(request, "You need to scan in first.")
-            elif attendance.scan_out_time:
-                messages.warning(request, "You have already scanned out today.")
-            else:
-                attendance.scan_out_time = now
-                attendance.save()
-                attendance.calculate_hours_worked()
-                messages.success(request, "Scan out successful.")
-
-                # Check if scanning out after work hours and log additional overtime
-                work_end = now.replace(hour=16, minute=0, second=0, microsecond=0)
-                if now > work_end:
-                    # additional_overtime = (now - work_end).total_seconds() / 3600
-                    # attendance.overtime_hours += additional_overtime
-                    # attendance.save()
-                    additional_overtime_float = (now - work_end).total_seconds() / 3600
-                    additional_overtime_decimal = Decimal(str(additional_overtime_float))
-
-                    # Ensure overtime_hours is not None if it could be (though model default is 0)
-                    if attendance.overtime_hours is None:
-                        attendance.overtime_hours = Decimal("0.00")
-                    attendance.overtime_hours += additional_overtime_decimal
-                    attendance.save(update_fields=["overtime_hours"])  # Save only the changed field
-
-                    messages.info(
-                        request,
-                        f"Additional overtime logged: {additional_overtime_decimal:.2f} hours",
-                    )
-
-        except Attendance.DoesNotExist:
+        if result.status == scans.NOT_SCANNED_IN:
             messages.error(request, "No attendance record found for today. Please scan in first.")
+        elif result.status == scans.ALREADY_SCANNED_OUT:
+            messages.warning(request, "You have already scanned out today.")
+        else:
+            messages.success(request, "Scan out successful.")
+            if result.overtime:
+                messages.info(
+                    request,
+                    f"Additional overtime logged: {result.overtime:.2f} hours",
+                )
 
         # return redirect("attendance_list")  # Redirect to an attendance list view
         return redirect("home")
 
     # return render(request, "core/scan_out.html")
-    return render(request, "core/clients/pages/home.html")
+    return await sync_to_async(render)(request, "core/clients/pages/home.html")
+
+
+# NOTE: Kiosk API
+MAX_SYNC_EVENTS = 5000
+
+
+def _kiosk_authorized(request):
+    token = settings.KIOSK_API_TOKEN
+    return bool(token) and hmac.compare_digest(request.headers.get("X-Kiosk-Token", ""), token)
+
+
+async def kiosk_scan(request):
+    """Records a scan-in or scan-out sent by an attendance kiosk.
+
+    Expects a JSON body ``{"employee": <id>, "action": "in" | "out"}`` and the
+    shared ``KIOSK_API_TOKEN`` in the ``X-Kiosk-Token`` header. The scan is
+    appended as a ScanEvent and folded into Attendance by the rollup worker
+    (``manage.py rollup_scan_events``).
+    """
+    # csrf_exempt and require_POST do not support async views in Django 4.2
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    if not _kiosk_authorized(request):
+        return JsonResponse({"ok": False, "status": "forbidden"}, status=403)
+
+    try:
+        payload = json.loads(request.body)
+        employee_id = int(payload["employee"])
+        action = payload["action"]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"ok": False, "status": "bad_request"}, status=400)
+    if action not in ("in", "out"):
+        return JsonResponse({"ok": False, "status": "bad_request"}, status=400)
+
+    try:
+        event = await scans.arecord_scan_event(employee_id, action.upper())
+    except IntegrityError:  # No such employee
+        return JsonResponse({"ok": False, "status": "unknown_employee"}, status=404)
+    return JsonResponse(
+        {
+            "ok": True,
+            "status": "recorded",
+            "id": event.pk,
+            "at": event.scanned_at.astimezone(scans.LOCAL_TZ).isoformat(),
+        },
+        status=202,
+    )
+
+
+kiosk_scan.csrf_exempt = True  # Authenticated by token, not by session
+
+
+def _sync_event(event):
+    """Validates one buffered scan, returning ``(key, employee_id, direction, scanned_at)``."""
+    key = event["key"]
+    if not isinstance(key, str) or not 0 < len(key) <= 64 or event["action"] not in ("in", "out"):
+        raise ValueError(event)
+    scanned_at = datetime.fromisoformat(event["at"])
+    if timezone.is_naive(scanned_at):
+        scanned_at = scanned_at.replace(tzinfo=scans.LOCAL_TZ)
+    return key, int(event["employee"]), event["action"].upper(), scanned_at
+
+
+async def kiosk_sync(request):
+    """Records scans buffered by a kiosk while it was offline.
+
+    Expects a JSON body ``{"events": [{"key": ..., "employee": <id>, "action": "in" |
+    "out", "at": <ISO timestamp>}, ...]}`` where ``key`` is a unique id generated by
+    the kiosk for each scan. Keys already recorded are reported as duplicates, so
+    a kiosk can safely resend a batch whose response it never received; it may
+    drop every event whose key is not listed under ``rejected``.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    if not _kiosk_authorized(request):
+        return JsonResponse({"ok": False, "status": "forbidden"}, status=403)
+
+    try:
+        payload = json.loads(request.body)["events"]
+        if not isinstance(payload, list) or len(payload) > MAX_SYNC_EVENTS:
+            raise ValueError(payload)
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"ok": False, "status": "bad_request"}, status=400)
+
+    events = []
+    rejected = []
+    for event in payload:
+        try:
+            events.append(_sync_event(event))
+        except (ValueError, TypeError, KeyError):
+            key = event.get("key") if isinstance(event, dict) else None
+            rejected.append({"key": key, "status": "bad_request"})
+
+    recorded, duplicates, unknown = await sync_to_async(scans.record_scan_events)(events)
+    rejected += [{"key": key, "status": "unknown_employee"} for key in unknown]
+    return JsonResponse(
+        {
+            "ok": True,
+            "status": "recorded",
+            "recorded": recorded,
+            "duplicates": len(duplicates),
+            "rejected": rejected,
+        },
+        status=202,
+    )
+
+
+kiosk_sync.csrf_exempt = True
 
 
 # NOTE: Dashboard section
@@ -189,11 +257,10 @@ def dashboard(request):
     active_employees = Employee.objects.filter(status__iexact="active").count()
     inactive_employees = total_employees - active_employees
 
-    current_month = timezone.now().month
-    current_year = timezone.now().year
+    month_start, month_end = month_range(timezone.now().year, timezone.now().month)
 
     salaries_current_month = SalaryCalculations.objects.filter(
-        month_year__year=current_year, month_year__month=current_month
+        month_year__gte=month_start, month_year__lt=month_end
     )
     salaries_paid_current_month = salaries_current_month.filter(status="PAID").count()
     salaries_pending_current_month = salaries_current_month.filter(status="PENDING").count()
@@ -209,23 +276,26 @@ def dashboard(request):
     chart_data_paid = []
     chart_data_pending = []
 
+    # One grouped query over the six-month range instead of two per month
+    first_month = month_start - relativedelta(months=5)
+    totals = {
+        (row["month_year"], row["status"]): row["total"]
+        for row in SalaryCalculations.objects.filter(
+            month_year__gte=first_month, month_year__lt=month_end
+        )
+        .order_by()
+        .values("month_year", "status")
+        .annotate(total=Sum("net_salary"))
+    }
+
     for i in range(5, -1, -1):  # Last 6 months, including current
-        month_date = timezone.now().date().replace(day=1) - relativedelta(months=i)
+        month_date = month_start - relativedelta(months=i)
         chart_labels.append(month_date.strftime("%b %Y"))  # e.g., Jul 2024
 
-        salaries_in_month = SalaryCalculations.objects.filter(
-            month_year__year=month_date.year, month_year__month=month_date.month
-        )
-
-        total_paid_in_month = (
-            salaries_in_month.filter(status="PAID").aggregate(total=Sum("net_salary"))["total"] or 0
-        )
+        total_paid_in_month = totals.get((month_date, "PAID")) or 0
         chart_data_paid.append(float(total_paid_in_month))  # Chart.js expects numbers
 
-        total_pending_in_month = (
-            salaries_in_month.filter(status="PENDING").aggregate(total=Sum("net_salary"))["total"]
-            or 0
-        )
+        total_pending_in_month = totals.get((month_date, "PENDING")) or 0
         chart_data_pending.append(float(total_pending_in_month))
 
     print("Chart Labels:", chart_labels)
@@ -283,15 +353,7 @@ def delete_user(request, pk):
 def manage_employees(request):
     # employee = Employee.objects.get(user=request.user)
     query = request.GET.get("search", "")
-    employees = Employee.objects.all().order_by("-updated_at")
-
-    if query:
-        # Search across multiple fields
-        employees = employees.filter(
-            Q(name__icontains=query)
-            | Q(contact_number__icontains=query)
-            | Q(user__email__icontains=query)
-        )
+    employees = search_employees(Employee.objects.all().order_by("-updated_at"), query)
 
     if request.method == "POST":
         form = EmployeeForm(request.POST)
@@ -352,13 +414,9 @@ def delete_employee(request, pk):
 def manage_salary_structures(request):
     query = request.GET.get("search", "")
     employees = Employee.objects.all().order_by("-updated_at")
-    structures = SalaryStructure.objects.all().order_by("-updated_at")
-
-    if query:
-        # Search across multiple fields
-        structures = structures.filter(
-            Q(basic_salary__icontains=query) | Q(bonus_percentage__icontains=query)
-        )
+    structures = search_salary_structures(
+        SalaryStructure.objects.all().order_by("-updated_at"), query
+    )
 
     if request.method == "POST":
         form = SalaryStructureForm(request.POST)
@@ -412,11 +470,7 @@ def delete_salary_structure(request, pk):
 def manage_deductions(request):
     query = request.GET.get("search", "")
     employees = Employee.objects.all().order_by("-updated_at")
-    deductions = Deductions.objects.all().order_by("-updated_at")
-
-    if query:
-        # Search across multiple fields
-        deductions = deductions.filter(Q(date__icontains=query) | Q(amount__icontains=query))
+    deductions = search_adjustments(Deductions.objects.all().order_by("-updated_at"), query)
 
     if request.method == "POST":
         form = DeductionsForm(request.POST)
@@ -470,11 +524,7 @@ def delete_deduction(request, pk):
 def manage_bonuses(request):
     query = request.GET.get("search", "")
     employees = Employee.objects.all().order_by("-updated_at")
-    bonuses = Bonuses.objects.all().order_by("-updated_at")
-
-    if query:
-        # Search across multiple fields
-        bonuses = bonuses.filter(Q(date__icontains=query) | Q(amount__icontains=query))
+    bonuses = search_adjustments(Bonuses.objects.all().order_by("-updated_at"), query)
 
     if request.method == "POST":
         form = BonusesForm(request.POST)
@@ -536,18 +586,11 @@ def manage_attendance(request):
     query = request.GET.get("search", "")
     # Fetch attendance records, ordering by date descending, then employee name
     # Use select_related to efficiently fetch related employee data
-    attendance_list = (
-        Attendance.objects.select_related("employee").all().order_by("-date", "employee__name")
+    attendance_list = search_attendance(
+        Attendance.objects.select_related("employee").all().order_by("-date", "employee__name"),
+        query,
     )
 
-    if query:
-        # Search across multiple fields: employee name, date (exact match or partial), shift
-        attendance_list = attendance_list.filter(
-            Q(employee__name__icontains=query)
-            | Q(date__icontains=query)  # Allows searching like '2024-07' or '2024-07-26'
-            | Q(shift__icontains=query)
-        )
-
     # Pagination (Optional but recommended for large datasets)
     page = request.GET.get("page", 1)
     paginator = Paginator(attendance_list, 10)  # Show 10 records per page
@@ -566,6 +609,36 @@ def manage_attendance(request):
     return render(request, "core/dashboard/pages/manage-attendance.html", context)
 
 
+@login_required
+@require_POST
+def import_attendance_logs(request):
+    """Imports uploaded badge-reader punch logs into attendance records."""
+    uploads = request.FILES.getlist("scan_logs")
+    if not uploads:
+        messages.error(request, "Please choose a CSV or Excel log file to import.")
+        return redirect("manage-attendance")
+
+    try:
+        result = import_scan_logs([(upload, upload.name) for upload in uploads])
+    except (ScanLogImportError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+        messages.error(request, f"Could not read the log file: {e}")
+        return redirect("manage-attendance")
+
+    if result.invalid_rows:
+        messages.warning(request, f"Skipped {result.invalid_rows} invalid rows.")
+    if result.unknown_employees:
+        ids = ", ".join(str(i) for i in sorted(result.unknown_employees))
+        messages.warning(
+            request, f"No employees found with ids: {ids}. Their punches were skipped."
+        )
+    messages.success(
+        request,
+        f"Imported {result.punches} punches: {result.created} attendance records created, "
+        f"{result.updated} updated.",
+    )
+    return redirect("manage-attendance")
+
+
 # --------- Salary Calculations Section ---------
 # NOTE: Salary Calculations Section
 @login_required
@@ -579,23 +652,15 @@ def manage_salary_calculations(request):
     employee_filter = request.GET.get("employee", "")
     status_filter = request.GET.get("status", "")
 
-    calculations_list = SalaryCalculations.objects.select_related("employee").all()
-
-    if selected_year and selected_month:
-        try:
-            year_int = int(selected_year)
-            month_int = int(selected_month)
-            calculations_list = calculations_list.filter(
-                month_year__year=year_int, month_year__month=month_int
-            )
-        except ValueError:
-            messages.error(request, "Invalid year or month selected.")
-
-    if employee_filter:
-        calculations_list = calculations_list.filter(employee_id=employee_filter)
-
-    if status_filter:
-        calculations_list = calculations_list.filter(status=status_filter)
+    calculations_list, month_valid = filter_salary_calculations(
+        SalaryCalculations.objects.select_related("employee").all(),
+        selected_year,
+        selected_month,
+        employee_filter,
+        status_filter,
+    )
+    if not month_valid:
+        messages.error(request, "Invalid year or month selected.")
 
     # Handle Salary Generation
     if request.method == "POST" and "generate_salary" in request.POST:
@@ -604,6 +669,9 @@ def manage_salary_calculations(request):
         gen_employee_id = request.POST.get(
             "generate_employee_id", None
         )  # Optional: for single employee
+        # Optional: last month of a multi-month backfill
+        gen_end_year = request.POST.get("generate_end_year")
+        gen_end_month = request.POST.get("generate_end_month")
 
         if not gen_year or not gen_month:
             messages.error(request, "Year and Month are required for salary generation.")
@@ -611,111 +679,28 @@ def manage_salary_calculations(request):
             try:
                 year = int(gen_year)
                 month = int(gen_month)
-                target_month_date = timezone.datetime(year, month, 1).date()
-
-                employees_to_process = Employee.objects.filter(
-                    status="active"
-                )  # Or your criteria for active employees
-                if gen_employee_id:
-                    employees_to_process = employees_to_process.filter(id=gen_employee_id)
-
-                generated_count = 0
-                failed_count = 0
-
-                for emp in employees_to_process:
-                    try:
-                        salary_structure = SalaryStructure.objects.get(
-                            employee=emp
-                        )  # Assuming one active structure
-
-                        # Aggregate Attendance
-                        attendance_for_month = Attendance.objects.filter(
-                            employee=emp, date__year=year, date__month=month
-                        )
-                        total_hours = (
-                            attendance_for_month.aggregate(Sum("hours_worked"))["hours_worked__sum"]
-                            or 0
-                        )
-                        total_overtime = (
-                            attendance_for_month.aggregate(Sum("overtime_hours"))[
-                                "overtime_hours__sum"
-                            ]
-                            or 0
-                        )
-
-                        # Aggregate Deductions
-                        total_deductions = (
-                            Deductions.objects.filter(
-                                employee=emp, date__year=year, date__month=month
-                            ).aggregate(Sum("amount"))["amount__sum"]
-                            or 0
-                        )
-
-                        # Aggregate Bonuses
-                        total_bonuses = (
-                            Bonuses.objects.filter(
-                                employee=emp, date__year=year, date__month=month
-                            ).aggregate(Sum("amount"))["amount__sum"]
-                            or 0
-                        )
-
-                        # Calculate Gross and Net Salary
-                        # This is a basic calculation, adjust as per your rules
-                        # E.g., if basic_salary is monthly fixed:
-                        gross_salary = (
-                            salary_structure.basic_salary
-                            + (total_overtime * salary_structure.overtime_rate)
-                            + total_bonuses
-                        )
-                        net_salary = gross_salary - total_deductions
-
-                        # Create or Update Salary Calculation
-                        calculation, created = SalaryCalculations.objects.update_or_create(
-                            employee=emp,
-                            month_year=target_month_date,
-                            defaults={
-                                "basic_salary_snapshot": salary_structure.basic_salary,
-                                "overtime_rate_snapshot": salary_structure.overtime_rate,
-                                "total_hours_worked": total_hours,
-                                "total_overtime_hours": total_overtime,
-                                "total_deductions_amount": total_deductions,
-                                "total_bonuses_amount": total_bonuses,
-                                "gross_salary": gross_salary,
-                                "net_salary": net_salary,
-                                "status": "PENDING",  # Reset to pending on re-generation if not paid
-                                "generated_at": timezone.now(),
-                            },
-                        )
-                        if not created and calculation.status == "PAID":
-                            # If overwriting a paid salary, perhaps set to pending or add a note.
-                            # For now, it will update if defaults change.
-                            messages.warning(
-                                request,
-                                f"Re-generated PENDING salary for {emp.name} for {target_month_date.strftime('%B %Y')}. Previous status was PAID.",
-                            )
-                            calculation.status = "PENDING"  # Ensure it's pending
-                            calculation.paid_at = None
-                            calculation.payment_method = None
-                            calculation.save()
-
-                        generated_count += 1
-                    except SalaryStructure.DoesNotExist:
-                        messages.error(
-                            request, f"No salary structure found for {emp.name}. Skipped."
-                        )
-                        failed_count += 1
-                    except Exception as e:
-                        messages.error(request, f"Error generating salary for {emp.name}: {str(e)}")
-                        failed_count += 1
-
-                if generated_count > 0:
-                    messages.success(
-                        request, f"Successfully generated/updated {generated_count} salary records."
-                    )
-                if failed_count > 0:
-                    messages.error(
-                        request, f"Failed to generate/update {failed_count} salary records."
-                    )
+                first_month = timezone.datetime(year, month, 1)  # Validate the month
+                end_year = end_month = None
+                if gen_end_year and gen_end_month:
+                    end_year = int(gen_end_year)
+                    end_month = int(gen_end_month)
+                    if timezone.datetime(end_year, end_month, 1) < first_month:
+                        raise ValueError("End month before start month")
+
+                # Generation runs in the payroll worker (manage.py run_payroll_worker)
+                job = PayrollJob.objects.create(
+                    year=year,
+                    month=month,
+                    end_year=end_year,
+                    end_month=end_month,
+                    employee_id=gen_employee_id or None,
+                    dirty_only="recompute_dirty_only" in request.POST,
+                    requested_by=request.user,
+                )
+                messages.info(
+                    request,
+                    f"Salary generation for {job.period_display} has been queued (job #{job.pk}).",
+                )
                 return redirect("manage-salary-calculations")  # Redirect to refresh list
 
             except ValueError:
@@ -736,6 +721,7 @@ def manage_salary_calculations(request):
 
     all_employees = Employee.objects.all().order_by("name")
     status_choices = SalaryCalculations.STATUS_CHOICES
+    payroll_jobs = PayrollJob.objects.select_related("employee")[:5]
 
     context = {
         "salary_calculations": calculations,
@@ -747,11 +733,106 @@ def manage_salary_calculations(request):
         "selected_employee_id": employee_filter,
         "selected_status": status_filter,
         "status_choices": status_choices,
+        "payroll_jobs": payroll_jobs,
         "delete_confirm_msg": "Are you sure you want to delete this salary calculation record?",
     }
     return render(request, "core/dashboard/pages/manage-salary-calculations.html", context)
 
 
+@login_required
+def payroll_job_status(request, pk):
+    """Returns the progress of a payroll job as JSON for the dashboard to poll."""
+    job = get_object_or_404(PayrollJob.objects.select_related("employee"), pk=pk)
+    return JsonResponse(
+        {
+            "id": job.pk,
+            "year": job.year,
+            "month": job.month,
+            "end_year": job.end_year,
+            "end_month": job.end_month,
+            "employee": job.employee.name if job.employee else None,
+            "dirty_only": job.dirty_only,
+            "status": job.status,
+            "status_display": job.get_status_display(),
+            "is_finished": job.is_finished,
+            "processed": job.processed,
+            "total": job.total,
+            "created": job.created_count,
+            "updated": job.updated_count,
+            "unchanged": job.unchanged_count,
+            "skipped": job.skipped_count,
+            "message": job.message,
+            "error": job.error,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+    )
+
+
+@login_required
+def payroll_simulator(request):
+    """Projects the cost of salary structure changes without writing any calculations."""
+    departments = (
+        Employee.objects.order_by("department").values_list("department", flat=True).distinct()
+    )
+    form = PayrollSimulationForm(request.GET or None, departments=departments)
+    result = None
+
+    if form.is_bound and form.is_valid():
+        data = form.cleaned_data
+        scenario = Scenario(
+            department=data["department"],
+            raise_percentage=data["raise_percentage"] or 0,
+            overtime_rate_change=data["overtime_rate_change"] or 0,
+            bonus_percentage_change=data["bonus_percentage_change"] or 0,
+            months=data["months"] or 12,
+            basis_months=data["basis_months"] or 3,
+        )
+        result = simulate(scenario)
+
+        if request.GET.get("format") == "json":
+            return JsonResponse(result)  # DjangoJSONEncoder serializes Decimals as strings
+    elif request.GET.get("format") == "json" and form.is_bound:
+        return JsonResponse({"error": form.errors}, status=400)
+
+    context = {
+        "form": form,
+        "result": result,
+    }
+    return render(request, "core/dashboard/pages/payroll-simulator.html", context)
+
+
+@login_required
+def manage_shift_schedules(request):
+    """Lists the shift calendar and adds shifts to it."""
+    form = ShiftScheduleForm(request.POST or None)
+
+    if request.method == "POST":
+        if form.is_valid():
+            form.save()
+            messages.success(request, "Shift created successfully.")
+            return redirect("manage-shift-schedules")
+        messages.error(request, "Shift could not be created.")
+
+    context = {
+        "form": form,
+        "schedules": ShiftSchedule.objects.all(),
+        "departments": Employee.objects.order_by("department")
+        .values_list("department", flat=True)
+        .distinct(),
+        "delete_confirm_msg": "Are you sure you want to delete this shift?",
+        "cache_seconds": SHIFT_CACHE_SECONDS,
+    }
+    return render(request, "core/dashboard/pages/manage-shift-schedules.html", context)
+
+
+@login_required
+@require_POST
+def delete_shift_schedule(request, pk):
+    get_object_or_404(ShiftSchedule, pk=pk).delete()
+    return redirect("manage-shift-schedules")
+
+
 @login_required
 def view_salary_calculation(request, pk):
     calculation = get_object_or_404(SalaryCalculations, pk=pk)
@@ -808,530 +889,101 @@ def delete_salary_calculation(request, pk):
 
 
 # --------- Export Section ---------
-# NOTE: Export to excel section
+# NOTE: Export to excel section; ?format=csv or ?format=csv.gz streams CSV instead
+def _export(request, export):
+    """Streams CSV at once; workbooks are built by the export worker and served from
+    its cache when the data has not changed since the last export."""
+    filters = export.clean_filters(request.GET)
+    export_format = request.GET.get("format")
+    if export_format in exports.CSV_FORMATS:
+        return export.stream_csv(filters, compress=export_format == "csv.gz")
+    return _export_job_response(request, export, filters)
+
+
+def _export_job_response(request, export, filters):
+    job = exports.request_export(export, filters, request.user)
+    if job.status == "DONE":
+        return exports.export_file_response(job)
+    return redirect("export-job", pk=job.pk)
+
+
 @login_required
 def export_employees_to_excel(request):
     """Exports employee data to an Excel file."""
-
-    # Define the response object for the Excel file
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="employees_report.xlsx"'
-
-    # Create an Excel workbook and select the active worksheet
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Employees"
-
-    # Define the header row
-    columns = [
-        "No.",
-        "Name",
-        "Email",
-        "Position",
-        "Department",
-        "Contact Number",
-        "Bank Account Number",
-        "Employment Date",
-        "Status",
-    ]
-    row_num = 1
-
-    # Write the header row to the worksheet
-    for col_num, column_title in enumerate(columns, 1):
-        cell = worksheet.cell(row=row_num, column=col_num)
-        cell.value = column_title
-        # Optional: Add some basic styling to the header
-        cell.font = openpyxl.styles.Font(bold=True)
-        cell.alignment = openpyxl.styles.Alignment(horizontal="center")
-
-    # Get employee data (consider applying search filter if needed, similar to manage_employees)
-    # For simplicity, exporting all employees here.
-    employees = (
-        Employee.objects.select_related("user").all().order_by("name")
-    )  # Use select_related for efficiency
-
-    # Write data rows
-    for i, emp in enumerate(employees, start=1):
-        row_num += 1
-        user_email = emp.user.email if emp.user else "N/A"
-        user_status = "Online" if emp.user and emp.user.is_active else "Offline"
-
-        row = [
-            i,
-            emp.name,
-            user_email,
-            emp.position,
-            emp.department,
-            emp.contact_number,
-            emp.bank_account_num,
-            (
-                emp.employment_date.strftime("%Y-%m-%d") if emp.employment_date else "N/A"
-            ),  # Format date
-            user_status,
-        ]
-
-        # Write the row to the worksheet
-        for col_num, cell_value in enumerate(row, 1):
-            cell = worksheet.cell(row=row_num, column=col_num)
-            cell.value = cell_value
-            # Optional: Align text columns to the left
-            if isinstance(cell_value, str):
-                cell.alignment = openpyxl.styles.Alignment(horizontal="left")
-
-    # Optional: Adjust column widths
-    for col_letter in ["B", "C", "D", "E", "F", "G", "H"]:  # Adjust letters based on your columns
-        worksheet.column_dimensions[col_letter].width = 20
-    worksheet.column_dimensions["A"].width = 5  # For No.
-
-    # Save the workbook to the HttpResponse
-    workbook.save(response)
-
-    return response
+    return _export(request, exports.EMPLOYEES)
 
 
 @login_required
 def export_salary_structures_to_excel(request):
     """Exports salary structure data to an Excel file."""
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="salary_structures_report.xlsx"'
-
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Salary Structures Report"
-
-    columns = [
-        "No.",
-        "Employee Name",
-        "Basic Salary (LAK)",
-        "Overtime Rate (LAK)",
-        "Bonus Percentage (%)",
-        "Created At",
-        "Updated At",
-    ]
-    row_num = 1
-
-    header_font = Font(bold=True)
-    center_alignment = Alignment(horizontal="center")
-    left_alignment = Alignment(horizontal="left")
-
-    for col_num, column_title in enumerate(columns, 1):
-        cell = worksheet.cell(row=row_num, column=col_num)
-        cell.value = column_title
-        cell.font = header_font
-        cell.alignment = center_alignment
-
-    search_query = request.GET.get("search", "")
-    structures_list = (
-        SalaryStructure.objects.select_related("employee")
-        .all()
-        .order_by("-updated_at", "employee__name")
-    )
-
-    if search_query:
-        structures_list = structures_list.filter(
-            Q(employee__name__icontains=search_query)
-            | Q(basic_salary__icontains=search_query)
-            | Q(bonus_percentage__icontains=search_query)
-        )
-
-    for i, structure in enumerate(structures_list, start=1):
-        row_num += 1
-        row_data = [
-            i,
-            structure.employee.name,
-            f"{structure.basic_salary:,.0f}",
-            f"{structure.overtime_rate:,.0f}",
-            f"{structure.bonus_percentage:.2f}",  # Assuming bonus_percentage is stored like 5.00 for 5%
-            structure.created_at.astimezone(pytz.timezone("Asia/Vientiane")).strftime(
-                "%Y-%m-%d %H:%M"
-            ),
-            structure.updated_at.astimezone(pytz.timezone("Asia/Vientiane")).strftime(
-                "%Y-%m-%d %H:%M"
-            ),
-        ]
-        for col_num, cell_value in enumerate(row_data, 1):
-            cell = worksheet.cell(row=row_num, column=col_num)
-            cell.value = cell_value
-            if col_num in [3, 4, 5]:  # Amount/Percentage columns
-                cell.alignment = Alignment(horizontal="right")
-            else:
-                cell.alignment = left_alignment
-
-    worksheet.column_dimensions["A"].width = 5
-    worksheet.column_dimensions["B"].width = 25  # Employee Name
-    worksheet.column_dimensions["C"].width = 20  # Basic Salary
-    worksheet.column_dimensions["D"].width = 20  # Overtime Rate
-    worksheet.column_dimensions["E"].width = 20  # Bonus Percentage
-    worksheet.column_dimensions["F"].width = 20  # Created At
-    worksheet.column_dimensions["G"].width = 20  # Updated At
-
-    workbook.save(response)
-    return response
+    return _export(request, exports.SALARY_STRUCTURES)
 
 
 @login_required
 def export_deductions_to_excel(request):
     """Exports deductions data to an Excel file."""
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="deductions_report.xlsx"'
-
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Deductions Report"
-
-    columns = [
-        "No.",
-        "Employee Name",
-        "Date",
-        "Reason",
-        "Amount (LAK)",
-        "Created At",
-        "Updated At",
-    ]
-    row_num = 1
-
-    header_font = Font(bold=True)
-    center_alignment = Alignment(horizontal="center")
-    left_alignment = Alignment(horizontal="left")
-
-    for col_num, column_title in enumerate(columns, 1):
-        cell = worksheet.cell(row=row_num, column=col_num)
-        cell.value = column_title
-        cell.font = header_font
-        cell.alignment = center_alignment
-
-    search_query = request.GET.get("search", "")
-    deductions_list = (
-        Deductions.objects.select_related("employee").all().order_by("-date", "employee__name")
-    )
-
-    if search_query:
-        deductions_list = deductions_list.filter(
-            Q(employee__name__icontains=search_query)
-            | Q(reason__icontains=search_query)
-            | Q(
-                date__icontains=search_query
-            )  # Basic date search, might need more robust parsing for specific formats
-        )
-
-    for i, deduction in enumerate(deductions_list, start=1):
-        row_num += 1
-        row_data = [
-            i,
-            deduction.employee.name,
-            deduction.date.strftime("%Y-%m-%d"),
-            deduction.reason,
-            f"{deduction.amount:,.0f}",  # Formatted amount
-            deduction.created_at.astimezone(pytz.timezone("Asia/Vientiane")).strftime(
-                "%Y-%m-%d %H:%M"
-            ),
-            deduction.updated_at.astimezone(pytz.timezone("Asia/Vientiane")).strftime(
-                "%Y-%m-%d %H:%M"
-            ),
-        ]
-        for col_num, cell_value in enumerate(row_data, 1):
-            cell = worksheet.cell(row=row_num, column=col_num)
-            cell.value = cell_value
-            if col_num == 5:  # Amount column
-                cell.alignment = Alignment(horizontal="right")
-            else:
-                cell.alignment = left_alignment
-
-    worksheet.column_dimensions["A"].width = 5
-    worksheet.column_dimensions["B"].width = 25  # Employee Name
-    worksheet.column_dimensions["C"].width = 12  # Date
-    worksheet.column_dimensions["D"].width = 30  # Reason
-    worksheet.column_dimensions["E"].width = 15  # Amount
-    worksheet.column_dimensions["F"].width = 20  # Created At
-    worksheet.column_dimensions["G"].width = 20  # Updated At
-
-    workbook.save(response)
-    return response
+    return _export(request, exports.DEDUCTIONS)
 
 
 @login_required
 def export_bonuses_to_excel(request):
     """Exports bonuses data to an Excel file."""
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="bonuses_report.xlsx"'
-
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Bonuses Report"
-
-    columns = ["No.", "Employee Name", "Date", "Reason", "Amount (LAK)", "Created At", "Updated At"]
-    row_num = 1
+    return _export(request, exports.BONUSES)
 
-    header_font = Font(bold=True)
-    center_alignment = Alignment(horizontal="center")
-    left_alignment = Alignment(horizontal="left")
 
-    for col_num, column_title in enumerate(columns, 1):
-        cell = worksheet.cell(row=row_num, column=col_num)
-        cell.value = column_title
-        cell.font = header_font
-        cell.alignment = center_alignment
-
-    search_query = request.GET.get("search", "")
-    bonuses_list = (
-        Bonuses.objects.select_related("employee").all().order_by("-date", "employee__name")
-    )
+@login_required
+def export_attendance_to_excel(request):
+    """Exports attendance data to an Excel file."""
+    return _export(request, exports.ATTENDANCE)
 
-    if search_query:
-        bonuses_list = bonuses_list.filter(
-            Q(employee__name__icontains=search_query)
-            | Q(reason__icontains=search_query)
-            | Q(date__icontains=search_query)
-        )
 
-    for i, bonus in enumerate(bonuses_list, start=1):
-        row_num += 1
-        row_data = [
-            i,
-            bonus.employee.name,
-            bonus.date.strftime("%Y-%m-%d"),
-            bonus.reason,
-            f"{bonus.amount:,.0f}",
-            bonus.created_at.astimezone(pytz.timezone("Asia/Vientiane")).strftime("%Y-%m-%d %H:%M"),
-            bonus.updated_at.astimezone(pytz.timezone("Asia/Vientiane")).strftime("%Y-%m-%d %H:%M"),
-        ]
-        for col_num, cell_value in enumerate(row_data, 1):
-            cell = worksheet.cell(row=row_num, column=col_num)
-            cell.value = cell_value
-            if col_num == 5:  # Amount column
-                cell.alignment = Alignment(horizontal="right")
-            else:
-                cell.alignment = left_alignment
-
-    worksheet.column_dimensions["A"].width = 5
-    worksheet.column_dimensions["B"].width = 25
-    worksheet.column_dimensions["C"].width = 12
-    worksheet.column_dimensions["D"].width = 30
-    worksheet.column_dimensions["E"].width = 15
-    worksheet.column_dimensions["F"].width = 20
-    worksheet.column_dimensions["G"].width = 20
-
-    workbook.save(response)
-    return response
+@login_required
+def export_salary_calculations_to_excel(request):
+    """Exports salary calculations to an Excel file, with the filters of the list page."""
+    return _export(request, exports.SALARY_CALCULATIONS)
 
 
 @login_required
-def export_attendance_to_excel(request):
-    """Exports attendance data to an Excel file."""
+def export_payroll_pack(request):
+    """Exports a month's summary, salary calculations, attendance, deductions and
+    bonuses as one workbook."""
+    try:
+        filters = exports.PAYROLL_PACK.clean_filters(request.GET)
+    except ValueError:
+        messages.error(request, "Invalid year or month selected.")
+        return redirect("manage-salary-calculations")
+    return _export_job_response(request, exports.PAYROLL_PACK, filters)
 
-    # Define the response object for the Excel file
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="attendance_report.xlsx"'
-
-    # Create an Excel workbook and select the active worksheet
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Attendance Report"
-
-    # Define the header row
-    columns = [
-        "No.",
-        "Employee Name",
-        "Date",
-        "Shift",
-        "Scan In Time",
-        "Scan Out Time",
-        "Hours Worked",
-        "Overtime Hours",
-        "Status",
-    ]
-    row_num = 1
-
-    # Write the header row to the worksheet
-    header_font = Font(bold=True)
-    center_alignment = Alignment(horizontal="center")
-    left_alignment = Alignment(horizontal="left")
-
-    for col_num, column_title in enumerate(columns, 1):
-        cell = worksheet.cell(row=row_num, column=col_num)
-        cell.value = column_title
-        cell.font = header_font
-        cell.alignment = center_alignment
-
-    # Get attendance data (consider applying search filter if needed)
-    # For simplicity, exporting all attendance here, ordered like the manage page.
-    # You could optionally reuse the search logic from manage_attendance if needed.
-    attendance_records = (
-        Attendance.objects.select_related("employee").all().order_by("-date", "employee__name")
-    )
 
-    # Write data rows
-    for i, att in enumerate(attendance_records, start=1):
-        row_num += 1
-        status = "Present" if att.is_present else "Absent"
-        # Format times safely, handling None values
-        scan_in_str = (
-            att.scan_in_time.astimezone(pytz.timezone("Asia/Vientiane")).strftime("%H:%M:%S")
-            if att.scan_in_time
-            else "--"
-        )
-        scan_out_str = (
-            att.scan_out_time.astimezone(pytz.timezone("Asia/Vientiane")).strftime("%H:%M:%S")
-            if att.scan_out_time
-            else "--"
-        )
-
-        row = [
-            i,
-            att.employee.name,
-            att.date.strftime("%Y-%m-%d"),  # Format date
-            att.get_shift_display(),
-            scan_in_str,
-            scan_out_str,
-            f"{att.hours_worked:.2f}" if att.hours_worked is not None else "0.00",  # Format decimal
-            (
-                f"{att.overtime_hours:.2f}" if att.overtime_hours is not None else "0.00"
-            ),  # Format decimal
-            status,
-        ]
-
-        # Write the row to the worksheet
-        for col_num, cell_value in enumerate(row, 1):
-            cell = worksheet.cell(row=row_num, column=col_num)
-            cell.value = cell_value
-            # Align text left, numbers/times potentially center or right if desired
-            if isinstance(cell_value, (int, float)) or col_num in [
-                5,
-                6,
-                7,
-                8,
-            ]:  # Align numbers/times center
-                cell.alignment = center_alignment
-            else:
-                cell.alignment = left_alignment
-
-    # Optional: Adjust column widths
-    worksheet.column_dimensions["A"].width = 5  # No.
-    worksheet.column_dimensions["B"].width = 25  # Employee Name
-    worksheet.column_dimensions["C"].width = 12  # Date
-    worksheet.column_dimensions["D"].width = 15  # Shift
-    worksheet.column_dimensions["E"].width = 15  # Scan In
-    worksheet.column_dimensions["F"].width = 15  # Scan Out
-    worksheet.column_dimensions["G"].width = 15  # Hours Worked
-    worksheet.column_dimensions["H"].width = 15  # Overtime
-    worksheet.column_dimensions["I"].width = 10  # Status
-
-    # Save the workbook to the HttpResponse
-    workbook.save(response)
-
-    return response
+@login_required
+def export_job(request, pk):
+    """Shows a queued export until its file is ready to download."""
+    job = get_object_or_404(ExportJob, pk=pk)
+    context = {
+        "job": job,
+        "export": exports.EXPORTS[job.export],
+    }
+    return render(request, "core/dashboard/pages/export-job.html", context)
 
 
 @login_required
-def export_salary_calculations_to_excel(request):
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="salary_calculations_report.xlsx"'
-
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Salary Calculations"
-
-    columns = [
-        "No.",
-        "Employee",
-        "Month-Year",
-        "Basic Salary",
-        "Overtime Rate",
-        "Total Hours Worked",
-        "Total Overtime Hours",
-        "Total Deductions",
-        "Total Bonuses",
-        "Gross Salary",
-        "Net Salary",
-        "Status",
-        "Payment Method",
-        "Paid At",
-        "Generated At",
-        "Notes",
-    ]
-    row_num = 1
-
-    header_font = Font(bold=True)
-    center_alignment = Alignment(horizontal="center")
-    left_alignment = Alignment(horizontal="left")
-
-    for col_num, column_title in enumerate(columns, 1):
-        cell = worksheet.cell(row=row_num, column=col_num)
-        cell.value = column_title
-        cell.font = header_font
-        cell.alignment = center_alignment
-
-    # Apply filters from request.GET if needed, similar to manage_salary_calculations view
-    selected_year = request.GET.get("year")
-    selected_month = request.GET.get("month")
-    employee_filter = request.GET.get("employee")
-    status_filter = request.GET.get("status")
-
-    queryset = (
-        SalaryCalculations.objects.select_related("employee")
-        .all()
-        .order_by("-month_year", "employee__name")
+def export_job_status(request, pk):
+    """Returns the status of an export job as JSON for the export page to poll."""
+    job = get_object_or_404(ExportJob, pk=pk)
+    return JsonResponse(
+        {
+            "id": job.pk,
+            "export": job.export,
+            "status": job.status,
+            "status_display": job.get_status_display(),
+            "is_finished": job.is_finished,
+            "rows": job.row_count,
+            "error": job.error,
+        }
     )
 
-    if selected_year and selected_month:
-        try:
-            queryset = queryset.filter(
-                month_year__year=int(selected_year), month_year__month=int(selected_month)
-            )
-        except ValueError:
-            pass  # Ignore invalid filter
-    if employee_filter:
-        queryset = queryset.filter(employee_id=employee_filter)
-    if status_filter:
-        queryset = queryset.filter(status=status_filter)
-
-    for i, calc in enumerate(queryset, start=1):
-        row_num += 1
-        paid_at_str = calc.paid_at.strftime("%Y-%m-%d %H:%M") if calc.paid_at else "--"
-        generated_at_str = (
-            calc.generated_at.strftime("%Y-%m-%d %H:%M") if calc.generated_at else "--"
-        )
 
-        row_data = [
-            i,
-            calc.employee.name,
-            calc.month_year.strftime("%B %Y"),
-            f"{calc.basic_salary_snapshot:.2f}",
-            f"{calc.overtime_rate_snapshot:.2f}",
-            f"{calc.total_hours_worked:.2f}",
-            f"{calc.total_overtime_hours:.2f}",
-            f"{calc.total_deductions_amount:.2f}",
-            f"{calc.total_bonuses_amount:.2f}",
-            f"{calc.gross_salary:.2f}",
-            f"{calc.net_salary:.2f}",
-            calc.get_status_display(),
-            calc.get_payment_method_display() if calc.payment_method else "--",
-            paid_at_str,
-            generated_at_str,
-            calc.notes,
-        ]
-        for col_num, cell_value in enumerate(row_data, 1):
-            cell = worksheet.cell(row=row_num, column=col_num)
-            cell.value = cell_value
-            cell.alignment = left_alignment  # Default left
-
-    # Adjust column widths (example)
-    worksheet.column_dimensions["B"].width = 25  # Employee Name
-    for col_letter in ["C", "D", "E", "F", "G", "H", "I", "J", "K", "L", "M", "N", "O", "P"]:
-        worksheet.column_dimensions[col_letter].width = 18
-    worksheet.column_dimensions["A"].width = 5
-
-    workbook.save(response)
-    return response
+@login_required
+def download_export_job(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, status="DONE")
+    return exports.export_file_response(job)